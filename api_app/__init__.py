@@ -3,11 +3,24 @@ from flask_bcrypt import Bcrypt
 from flask_marshmallow import Marshmallow
 from flask_sqlalchemy import SQLAlchemy
 
-app = Flask(__name__)
+from .cache import ResponseCache
+from .events import EventFeed
+from .ownership import OwnershipIndex
+from .ratelimit import RateLimiter
+from .revocation import RevocationList
+from .slowlog import SlowQueryLog
+from .timing import ServerTiming
 
 db = SQLAlchemy()
 ma = Marshmallow()
 bcrypt = Bcrypt()
+cache = ResponseCache()
+event_feed = EventFeed()
+limiter = RateLimiter()
+ownership = OwnershipIndex()
+server_timing = ServerTiming()
+slow_query_log = SlowQueryLog()
+revocation = RevocationList()
 
 
 def create_app():
@@ -16,8 +29,16 @@ def create_app():
     db.init_app(app)
     ma.init_app(app)
     bcrypt.init_app(app)
+    cache.init_app(app)
+    event_feed.init_app(app)
+    limiter.init_app(app)
+    ownership.init_app(app)
+    server_timing.init_app(app)
+    slow_query_log.init_app(app)
+    revocation.init_app(app)
 
     from .views import api_blueprint
     app.register_blueprint(api_blueprint)
-    
+    app.extensions["warmup"] = {"warmed": False}
+
     return app
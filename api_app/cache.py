@@ -0,0 +1,195 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+from flask import current_app, g, has_app_context
+
+
+class MemoryBackend:
+    """In-process LRU store with per-entry TTL and a byte budget.
+
+    Only coherent inside one worker process, use ``RedisBackend`` when the
+    app runs with several workers.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.size = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value, _ = entry
+            if expires_at is not None and expires_at <= self.clock():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._set(key, value, ttl)
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > self.clock()):
+                return False
+            self._set(key, value, ttl)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def _set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        self._pop(key)
+        size = len(key) + len(value)
+        if size > self.max_bytes:
+            return
+        expires_at = self.clock() + ttl if ttl is not None else None
+        self._entries[key] = (expires_at, value, size)
+        self.size += size
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            self._pop(next(iter(self._entries)))
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+
+class RedisBackend:
+    """Shared store on top of a redis-py compatible client."""
+
+    def __init__(
+        self, client: Any, prefix: str = "", errors: Tuple[type, ...] = (ConnectionError, TimeoutError)
+    ) -> None:
+        self.client = client
+        self.prefix = prefix
+        # What the client raises when the server is unreachable or slow.
+        self.errors = errors
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = "") -> "RedisBackend":
+        try:
+            import redis
+        except ImportError as err:
+            raise RuntimeError("The redis package is required for the redis cache backend") from err
+        return cls(redis.Redis.from_url(url), prefix, (redis.RedisError, OSError))
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.client.set(self.prefix + key, value, px=_milliseconds(ttl))
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        return bool(self.client.set(self.prefix + key, value, nx=True, px=_milliseconds(ttl)))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+
+def _milliseconds(ttl: Optional[float]) -> Optional[int]:
+    return max(1, int(ttl * 1000)) if ttl is not None else None
+
+
+def create_backend(config: Any) -> Any:
+    if config["CACHE_BACKEND"] == "memory":
+        return MemoryBackend(config["CACHE_MAX_ENTRIES"], config["CACHE_MAX_BYTES"])
+    if config["CACHE_BACKEND"] == "redis":
+        return RedisBackend.from_url(config["CACHE_REDIS_URL"], config["CACHE_KEY_PREFIX"])
+    raise ValueError(f"Unknown cache backend: { config['CACHE_BACKEND'] }")
+
+
+class ResponseCache:
+    """Per-user cache of rendered item lists.
+
+    Every user has a generation token, cached bodies are stored under the
+    current generation, so invalidation is a single write and a rebuild that
+    raced with it lands under a generation nobody reads any more.
+    """
+
+    def __init__(self, app: Any = None) -> None:
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Any) -> None:
+        app.extensions["response_cache"] = create_backend(app.config)
+
+    @staticmethod
+    def _state() -> Any:
+        return current_app.extensions["response_cache"], current_app.config
+
+    def get_or_build(self, user_id: int, builder: Callable[[], bytes], variant: str = "") -> bytes:
+        backend, config = self._state()
+        # Inside a batch the builder may see uncommitted rows, keep them out.
+        if not config["CACHE_ENABLED"] or g.get("deferred_invalidations") is not None:
+            return builder()
+        key = f"items:{ user_id }:{ self._generation(backend, user_id) }:{ variant }"
+        value = backend.get(key)
+        if value is not None:
+            return value
+
+        # Stampede protection: only the lock holder rebuilds, the others wait
+        # for its result and fall back to building themselves on timeout.
+        lock_key = f"lock:{ key }"
+        lock_timeout = config["CACHE_LOCK_TIMEOUT_SECONDS"]
+        deadline = time.monotonic() + lock_timeout
+        locked = backend.add(lock_key, b"1", lock_timeout)
+        while not locked and time.monotonic() < deadline:
+            time.sleep(config["CACHE_LOCK_POLL_SECONDS"])
+            value = backend.get(key)
+            if value is not None:
+                return value
+            locked = backend.add(lock_key, b"1", lock_timeout)
+        try:
+            value = builder()
+            backend.set(key, value, config["CACHE_TTL_SECONDS"])
+        finally:
+            if locked:
+                backend.delete(lock_key)
+        return value
+
+    def invalidate(self, *user_ids: int) -> None:
+        backend, config = self._state()
+        if not config["CACHE_ENABLED"]:
+            return
+        # A batch request commits once at the end and invalidates then.
+        deferred = g.get("deferred_invalidations") if has_app_context() else None
+        if deferred is not None:
+            deferred.update(user_ids)
+            return
+        for user_id in set(user_ids):
+            backend.set(f"generation:{ user_id }", uuid.uuid4().hex.encode())
+
+    @staticmethod
+    def _generation(backend: Any, user_id: int) -> str:
+        key = f"generation:{ user_id }"
+        generation = backend.get(key)
+        if generation is None:
+            # A fresh random token can never match entries built under a
+            # generation that was evicted.
+            token = uuid.uuid4().hex.encode()
+            backend.add(key, token)
+            # The backend may not keep it, the token is unique either way.
+            generation = backend.get(key) or token
+        return generation.decode()
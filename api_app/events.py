@@ -0,0 +1,156 @@
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List
+
+from flask import current_app, g, has_app_context
+
+from .cache import RedisBackend
+
+
+class MemoryBroker:
+    """Per-user event streams kept in process memory.
+
+    Only coherent inside one worker process, use ``SharedBroker`` when the
+    app runs with several workers.
+    """
+
+    def __init__(self, max_events: int = 100, max_users: int = 100000) -> None:
+        self.max_events = max_events
+        self.max_users = max_users
+        self._streams: "OrderedDict[int, list]" = OrderedDict()
+        self._condition = threading.Condition()
+
+    def publish(self, user_id: int, event: Dict[str, Any]) -> int:
+        with self._condition:
+            stream = self._streams.get(user_id)
+            if stream is None:
+                stream = self._streams[user_id] = [0, deque(maxlen=self.max_events)]
+                if len(self._streams) > self.max_users:
+                    self._streams.popitem(last=False)
+            else:
+                self._streams.move_to_end(user_id)
+            stream[0] += 1
+            stream[1].append({"id": stream[0], **event})
+            self._condition.notify_all()
+            return stream[0]
+
+    def fetch(self, user_id: int, after_id: int) -> List[Dict[str, Any]]:
+        with self._condition:
+            return self._fetch(user_id, after_id)
+
+    def wait(self, user_id: int, after_id: int, timeout: float) -> List[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            events = self._fetch(user_id, after_id)
+            while not events:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+                events = self._fetch(user_id, after_id)
+            return events
+
+    def _fetch(self, user_id: int, after_id: int) -> List[Dict[str, Any]]:
+        stream = self._streams.get(user_id)
+        if stream is None:
+            return []
+        last_id, events = stream
+        return [event for event in events if event["id"] > _resume_after(last_id, after_id)]
+
+
+class SharedBroker:
+    """Per-user event streams in a shared cache backend, readers poll it.
+
+    A user's stream is a single key, so a poll with nothing new is one GET.
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        max_events: int = 100,
+        ttl: float = 3600,
+        poll_interval: float = 0.5,
+        lock_attempts: int = 50,
+    ) -> None:
+        self.backend = backend
+        self.max_events = max_events
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.lock_attempts = lock_attempts
+
+    def publish(self, user_id: int, event: Dict[str, Any]) -> int:
+        key = f"events:{ user_id }"
+        lock_key = f"{ key }:lock"
+        for _ in range(self.lock_attempts):
+            locked = self.backend.add(lock_key, b"1", 1)
+            if locked:
+                break
+            time.sleep(0.001)
+        # Without the lock a concurrent publish may be lost, recipients still
+        # see the item itself in their list.
+        try:
+            stream = self._load(user_id)
+            stream["last_id"] += 1
+            stream["events"] = stream["events"][-(self.max_events - 1):] + [{"id": stream["last_id"], **event}]
+            self.backend.set(key, json.dumps(stream).encode(), self.ttl)
+            return stream["last_id"]
+        finally:
+            if locked:
+                self.backend.delete(lock_key)
+
+    def fetch(self, user_id: int, after_id: int) -> List[Dict[str, Any]]:
+        stream = self._load(user_id)
+        after_id = _resume_after(stream["last_id"], after_id)
+        return [event for event in stream["events"] if event["id"] > after_id]
+
+    def wait(self, user_id: int, after_id: int, timeout: float) -> List[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        events = self.fetch(user_id, after_id)
+        while not events and time.monotonic() < deadline:
+            time.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+            events = self.fetch(user_id, after_id)
+        return events
+
+    def _load(self, user_id: int) -> Dict[str, Any]:
+        value = self.backend.get(f"events:{ user_id }")
+        return json.loads(value) if value is not None else {"last_id": 0, "events": []}
+
+
+def _resume_after(last_id: int, after_id: int) -> int:
+    # An id past the end of the stream means it was evicted or expired and
+    # started over, so the client gets everything that is there now.
+    return after_id if after_id <= last_id else 0
+
+
+class EventFeed:
+    """Publishes per-user events read by GET /api/v1/events."""
+
+    def __init__(self, app: Any = None) -> None:
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Any) -> None:
+        config = app.config
+        if config["EVENTS_BACKEND"] == "memory":
+            broker = MemoryBroker(config["EVENTS_MAX_PER_USER"])
+        elif config["EVENTS_BACKEND"] == "redis":
+            broker = SharedBroker(
+                RedisBackend.from_url(config["CACHE_REDIS_URL"], config["CACHE_KEY_PREFIX"]),
+                config["EVENTS_MAX_PER_USER"],
+                config["EVENTS_TTL_SECONDS"],
+                config["EVENTS_POLL_INTERVAL_SECONDS"],
+            )
+        else:
+            raise ValueError(f"Unknown events backend: { config['EVENTS_BACKEND'] }")
+        app.extensions["events"] = broker
+
+    def publish(self, user_id: int, event_type: str, data: Dict[str, Any]) -> None:
+        # A batch request publishes once it has committed.
+        deferred = g.get("deferred_events") if has_app_context() else None
+        if deferred is not None:
+            deferred.append((user_id, event_type, data))
+            return
+        current_app.extensions["events"].publish(user_id, {"type": event_type, "data": data})
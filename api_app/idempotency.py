@@ -0,0 +1,147 @@
+import hashlib
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from typing import Any, Callable, Optional, Tuple
+
+from flask import current_app, g, request
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+from .models import IdempotencyKey
+
+IDEMPOTENCY_KEYS = IdempotencyKey.__table__
+
+
+def idempotent(function: Any) -> Any:
+    """Run a POST handler once per user and Idempotency-Key, replay its response after.
+
+    Goes below token_required. A repeat that arrives while the first request
+    is still running waits for its response instead of running the handler
+    again, unless that request's lease ran out without a response. Responses
+    with a 5xx status are not kept, so those can be retried.
+    """
+
+    @wraps(function)
+    def decorator(user: Any, *args: Any, **kwargs: Any) -> Callable:
+        key = request.headers.get("Idempotency-Key")
+        # Operations of a batch request have no headers of their own.
+        if key is None or g.get("batch"):
+            return function(user, *args, **kwargs)
+        if not 0 < len(key) <= 255:
+            return {"message": "Idempotency-Key must be 1 to 255 characters long"}, 422
+        config = current_app.config
+        request_hash = hashlib.sha256(
+            f"{ request.method } { request.full_path }\n".encode() + request.get_data()
+        ).hexdigest()
+        _delete_expired(user.id)
+        deadline = time.monotonic() + config["IDEMPOTENCY_WAIT_SECONDS"]
+        while True:
+            claimed, stored = _claim(
+                user.id, key, request_hash, config["IDEMPOTENCY_TTL_SECONDS"], config["IDEMPOTENCY_LEASE_SECONDS"]
+            )
+            if claimed:
+                break
+            if stored is None:
+                # The first request failed and released the key in between.
+                continue
+            if stored.request_hash != request_hash:
+                return {"message": "Idempotency-Key was already used for another request"}, 422
+            if stored.status_code is not None:
+                return current_app.response_class(
+                    stored.response,
+                    status=stored.status_code,
+                    mimetype="application/json",
+                    headers={"Idempotent-Replayed": "true"},
+                )
+            if stored.locked_until is None or stored.locked_until <= datetime.utcnow():
+                # The first request never finished, run the handler here instead.
+                if _take_over(user.id, key, config["IDEMPOTENCY_LEASE_SECONDS"]):
+                    break
+                continue
+            if time.monotonic() >= deadline:
+                return {"message": "A request with this Idempotency-Key is still in progress"}, 409
+            time.sleep(config["IDEMPOTENCY_POLL_SECONDS"])
+
+        try:
+            response = current_app.make_response(function(user, *args, **kwargs))
+        except Exception:
+            _release(user.id, key)
+            raise
+        if response.status_code >= 500:
+            _release(user.id, key)
+        else:
+            _store(user.id, key, response.status_code, response.get_data(as_text=True))
+        return response
+
+    return decorator
+
+
+# Keys are claimed and completed on connections of their own, so concurrent
+# requests see them at once and the handler's transaction stays untouched.
+
+
+def _delete_expired(user_id: int) -> None:
+    with db.get_engine().begin() as connection:
+        connection.execute(
+            delete(IDEMPOTENCY_KEYS).where(
+                IDEMPOTENCY_KEYS.c.user_id == user_id, IDEMPOTENCY_KEYS.c.expires_at < datetime.utcnow()
+            )
+        )
+
+
+def _claim(user_id: int, key: str, request_hash: str, ttl: float, lease: float) -> Tuple[bool, Optional[Any]]:
+    engine = db.get_engine()
+    now = datetime.utcnow()
+    try:
+        with engine.begin() as connection:
+            connection.execute(
+                insert(IDEMPOTENCY_KEYS).values(
+                    user_id=user_id,
+                    key=key,
+                    request_hash=request_hash,
+                    expires_at=now + timedelta(seconds=ttl),
+                    locked_until=now + timedelta(seconds=lease),
+                )
+            )
+        return True, None
+    except IntegrityError:
+        with engine.connect() as connection:
+            stored = connection.execute(
+                select(IDEMPOTENCY_KEYS).where(IDEMPOTENCY_KEYS.c.user_id == user_id, IDEMPOTENCY_KEYS.c.key == key)
+            ).first()
+        return False, stored
+
+
+def _take_over(user_id: int, key: str, lease: float) -> bool:
+    now = datetime.utcnow()
+    # Conditional, so only one of several waiting repeats gets the key.
+    with db.get_engine().begin() as connection:
+        result = connection.execute(
+            update(IDEMPOTENCY_KEYS)
+            .where(
+                IDEMPOTENCY_KEYS.c.user_id == user_id,
+                IDEMPOTENCY_KEYS.c.key == key,
+                IDEMPOTENCY_KEYS.c.status_code.is_(None),
+                or_(IDEMPOTENCY_KEYS.c.locked_until.is_(None), IDEMPOTENCY_KEYS.c.locked_until <= now),
+            )
+            .values(locked_until=now + timedelta(seconds=lease))
+        )
+    return result.rowcount == 1
+
+
+def _store(user_id: int, key: str, status_code: int, body: str) -> None:
+    with db.get_engine().begin() as connection:
+        connection.execute(
+            update(IDEMPOTENCY_KEYS)
+            .where(IDEMPOTENCY_KEYS.c.user_id == user_id, IDEMPOTENCY_KEYS.c.key == key)
+            .values(status_code=status_code, response=body)
+        )
+
+
+def _release(user_id: int, key: str) -> None:
+    with db.get_engine().begin() as connection:
+        connection.execute(
+            delete(IDEMPOTENCY_KEYS).where(IDEMPOTENCY_KEYS.c.user_id == user_id, IDEMPOTENCY_KEYS.c.key == key)
+        )
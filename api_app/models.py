@@ -1,16 +1,35 @@
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+
+from flask import g, has_app_context
+
 from . import bcrypt, db
 
 
+def commit():
+    # Inside POST /api/v1/batch the batch owns the transaction, handlers only
+    # flush their changes into it.
+    if has_app_context() and g.get("batch"):
+        db.session.flush()
+    else:
+        db.session.commit()
+
+
 class User(db.Model):
     __tablename__ = "users"
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password = db.Column(db.String(128), nullable=False)
-    items = db.relationship("Item", backref="user", lazy="joined")
+    # Tombstoned items are not the user's any more, for every load and
+    # User.items.any() alike.
+    items = db.relationship(
+        "Item", backref="user", lazy="joined", primaryjoin="and_(User.id == Item.user_id, Item.deleted_at.is_(None))"
+    )
 
     def create(self):
         db.session.add(self)
-        db.session.commit()
+        commit()
         return self
 
     def verify_password(self, password):
@@ -26,8 +45,101 @@ class Item(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
+    # Set by DELETE, the row stays until purge_items.py removes it.
+    deleted_at = db.Column(db.DateTime)
+    # Partial indexes where the dialect has them: live rows for the reads,
+    # tombstones for the purge. MySQL gets plain indexes on the same columns.
+    __table_args__ = (
+        db.Index(
+            "ix_items_live_user_id",
+            "user_id",
+            "id",
+            sqlite_where=deleted_at.is_(None),
+            postgresql_where=deleted_at.is_(None),
+        ),
+        db.Index(
+            "ix_items_deleted_at",
+            "deleted_at",
+            sqlite_where=deleted_at.isnot(None),
+            postgresql_where=deleted_at.isnot(None),
+        ),
+    )
 
     def create(self):
         db.session.add(self)
-        db.session.commit()
+        commit()
         return self
+
+    @classmethod
+    def live(cls):
+        return cls.query.filter(cls.deleted_at.is_(None))
+
+
+class RefreshToken(db.Model):
+    __tablename__ = "refresh_tokens"
+    id = db.Column(db.Integer, primary_key=True)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    revoked = db.Column(db.Boolean, nullable=False, default=False)
+
+    @staticmethod
+    def hash(token):
+        # Refresh tokens are 256 random bits, a fast digest is enough here and
+        # keeps the refresh path free of bcrypt.
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, user_id, period_seconds):
+        now = datetime.utcnow()
+        cls.query.filter(cls.user_id == user_id, cls.expires_at < now).delete(synchronize_session=False)
+        token = secrets.token_urlsafe(32)
+        db.session.add(
+            cls(token_hash=cls.hash(token), user_id=user_id, expires_at=now + timedelta(seconds=period_seconds))
+        )
+        return token
+
+    @classmethod
+    def find(cls, token):
+        return (
+            db.session.query(cls, User.username)
+            .join(User, User.id == cls.user_id)
+            .filter(cls.token_hash == cls.hash(token))
+            .first()
+        )
+
+    @classmethod
+    def rotate(cls, token_id):
+        # Conditional update: of two concurrent refreshes with one token only
+        # the first sees it unrevoked, the other is treated as reuse.
+        return cls.query.filter_by(id=token_id, revoked=False).update(
+            {"revoked": True}, synchronize_session=False
+        ) == 1
+
+    @classmethod
+    def revoke_all(cls, user_id):
+        cls.query.filter_by(user_id=user_id, revoked=False).update({"revoked": True})
+
+
+class RevokedToken(db.Model):
+    __tablename__ = "revoked_tokens"
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(32), unique=True, nullable=False)
+    # Rows are pruned once the token they revoke would have expired anyway.
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class IdempotencyKey(db.Model):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (db.UniqueConstraint("user_id", "key"),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    # None while the first request with the key is still running.
+    status_code = db.Column(db.Integer)
+    response = db.Column(db.Text)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    # The running request holds the key until then, once it has passed a
+    # repeat takes over, e.g. after the worker died.
+    locked_until = db.Column(db.DateTime)
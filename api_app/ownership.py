@@ -0,0 +1,96 @@
+from typing import Any, Dict, Optional
+
+from flask import current_app, g, has_app_context
+from sqlalchemy import select
+
+from .cache import MemoryBackend, create_backend
+
+
+class OwnershipIndex:
+    """Item id -> owner user id, read through from the items table.
+
+    Handlers that change an owner write the new one through after their
+    commit. Entries are only ever filled with add(), so a read-through that
+    raced with a write can't overwrite it. With the "memory" cache backend
+    the index is per worker, so it is off by default, get_item checks the row
+    it updates either way.
+    """
+
+    def __init__(self, app: Any = None) -> None:
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Any) -> None:
+        if app.config["CACHE_BACKEND"] == "memory":
+            backend = MemoryBackend(app.config["OWNERSHIP_MAX_ENTRIES"])
+        else:
+            backend = create_backend(app.config)
+        app.extensions["ownership"] = backend
+
+    @staticmethod
+    def _state() -> Any:
+        return current_app.extensions["ownership"], current_app.config
+
+    def owner(self, item_id: int) -> Optional[int]:
+        # Imported here, api_app imports this module before db exists.
+        from . import queries
+
+        backend, config = self._state()
+        # Inside a batch the lookup may see uncommitted rows, keep them out.
+        if not config["OWNERSHIP_ENABLED"] or g.get("deferred_ownership") is not None:
+            return queries.item_owner(item_id)
+        value = backend.get(f"owner:{ item_id }")
+        if value is not None:
+            return int(value)
+        # Only owned items are cached, a miss for an unknown id costs a query
+        # but can never hide an item imported later.
+        owner = queries.item_owner(item_id)
+        if owner is not None:
+            backend.add(f"owner:{ item_id }", str(owner).encode(), config["OWNERSHIP_TTL_SECONDS"])
+        return owner
+
+    def set(self, item_id: int, user_id: Optional[int]) -> None:
+        """Record the committed owner, None once the item is deleted."""
+        backend, config = self._state()
+        if not config["OWNERSHIP_ENABLED"]:
+            return
+        # A batch request commits once at the end and writes then.
+        deferred = g.get("deferred_ownership") if has_app_context() else None
+        if deferred is not None:
+            deferred.append((item_id, user_id))
+            return
+        if user_id is None:
+            backend.delete(f"owner:{ item_id }")
+        else:
+            backend.set(f"owner:{ item_id }", str(user_id).encode(), config["OWNERSHIP_TTL_SECONDS"])
+
+    def verify(self, batch_size: int = 1000, repair: bool = False) -> Dict[str, Any]:
+        """Compare every cached entry with the items table, drop wrong ones when repairing."""
+        from . import db
+        from .models import Item
+
+        backend, _ = self._state()
+        stats: Dict[str, Any] = {"checked": 0, "cached": 0, "mismatched": []}
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(Item.id, Item.user_id, Item.deleted_at)
+                .where(Item.id > last_id)
+                .order_by(Item.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            for item_id, user_id, deleted_at in rows:
+                stats["checked"] += 1
+                value = backend.get(f"owner:{ item_id }")
+                if value is None:
+                    continue
+                stats["cached"] += 1
+                if deleted_at is not None or int(value) != user_id:
+                    stats["mismatched"].append(item_id)
+                    if repair:
+                        backend.delete(f"owner:{ item_id }")
+            last_id = rows[-1][0]
+        return stats
@@ -0,0 +1,101 @@
+"""Hot handler statements, built once and executed with bound parameters.
+
+SQLAlchemy keys its compiled cache on the statement structure, so each of
+these compiles once per engine and every later call is a cache hit.
+"""
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, event, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+from sqlalchemy.orm import lazyload
+
+from . import db
+from .models import Item, User
+
+# Authentication needs the user row only, not the eagerly joined items.
+USER_BY_USERNAME = select(User).options(lazyload(User.items)).where(User.username == bindparam("username"))
+USER_ID_BY_USERNAME = select(User.id).where(User.username == bindparam("username"))
+# Tombstoned items are filtered out of every read, User.items does so itself.
+LIVE = Item.deleted_at.is_(None)
+ITEMS_BY_USER = select(Item).where(Item.user_id == bindparam("user_id"), LIVE).order_by(Item.id)
+ITEM_OWNER = select(Item.user_id).where(Item.id == bindparam("item_id"), LIVE)
+
+ITEM_COLUMNS = ("id", "name", "user_id")
+_items_by_user_columns: Dict[Tuple[str, ...], Any] = {}
+_item_by_id_columns: Dict[Tuple[str, ...], Any] = {}
+
+
+def _projection(cache: Dict[Tuple[str, ...], Any], columns: Sequence[str], build: Any) -> Any:
+    # One statement per distinct column list, so projections hit the
+    # compiled cache just like the fixed statements above.
+    key = tuple(columns)
+    statement = cache.get(key)
+    if statement is None:
+        statement = cache[key] = build(*(getattr(Item, column) for column in key))
+    return statement
+
+
+def user_by_username(username: str) -> Optional[User]:
+    return db.session.execute(USER_BY_USERNAME, {"username": username}).scalars().first()
+
+
+def user_id_by_username(username: str) -> Optional[int]:
+    return db.session.execute(USER_ID_BY_USERNAME, {"username": username}).scalar()
+
+
+def items_by_user(user_id: int) -> List[Item]:
+    return db.session.execute(ITEMS_BY_USER, {"user_id": user_id}).scalars().all()
+
+
+def item_columns_by_user(user_id: int, columns: Optional[Sequence[str]] = None) -> List[Any]:
+    statement = _projection(
+        _items_by_user_columns,
+        columns or ITEM_COLUMNS,
+        lambda *selected: select(*selected).where(Item.user_id == bindparam("user_id"), LIVE).order_by(Item.id),
+    )
+    return db.session.execute(statement, {"user_id": user_id}).all()
+
+
+def item_columns_by_id(item_id: int, columns: Optional[Sequence[str]] = None) -> Optional[Any]:
+    statement = _projection(
+        _item_by_id_columns,
+        columns or ITEM_COLUMNS,
+        lambda *selected: select(*selected).where(Item.id == bindparam("item_id"), LIVE),
+    )
+    return db.session.execute(statement, {"item_id": item_id}).first()
+
+
+def item_owner(item_id: int) -> Optional[int]:
+    return db.session.execute(ITEM_OWNER, {"item_id": item_id}).scalar()
+
+
+class StatementCacheStats:
+    """Process wide counters of compiled cache hits, fed by an engine event."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        cache_hit = getattr(context, "cache_hit", None)
+        if cache_hit is CACHE_HIT:
+            with self._lock:
+                self.hits += 1
+        elif cache_hit is CACHE_MISS:
+            with self._lock:
+                self.misses += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else None}
+
+
+statement_cache_stats = StatementCacheStats()
+event.listen(Engine, "after_cursor_execute", statement_cache_stats.record)
@@ -0,0 +1,150 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from typing import Any, Callable, Optional, Tuple
+
+from flask import current_app, g, request
+
+from .cache import RedisBackend
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rule(rule: str) -> Tuple[int, float]:
+    """Turn "10/minute" or "10/60" into (capacity, tokens refilled per second)."""
+    capacity, period = rule.split("/")
+    seconds = PERIODS[period] if period in PERIODS else float(period)
+    return int(capacity), int(capacity) / seconds
+
+
+def _take(tokens: float, capacity: int, refill_rate: float) -> Tuple[bool, float, float]:
+    allowed = tokens >= 1
+    if allowed:
+        tokens -= 1
+    return allowed, tokens, (capacity - tokens) / refill_rate
+
+
+class MemoryBucketStore:
+    """Token buckets kept in process memory, least recently used are dropped first."""
+
+    def __init__(self, max_keys: int = 100000, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, capacity: int, refill_rate: float) -> Tuple[bool, float, float]:
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(capacity), now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * refill_rate)
+                bucket[1] = now
+            allowed, bucket[0], reset = _take(bucket[0], capacity, refill_rate)
+            return allowed, bucket[0], reset
+
+
+class SharedBucketStore:
+    """Token buckets in a shared cache backend, guarded by a short per-key lock."""
+
+    def __init__(self, backend: Any, clock: Callable[[], float] = time.time, lock_attempts: int = 50) -> None:
+        self.backend = backend
+        self.clock = clock
+        self.lock_attempts = lock_attempts
+
+    def consume(self, key: str, capacity: int, refill_rate: float) -> Tuple[bool, float, float]:
+        try:
+            consumed = self._consume(key, capacity, refill_rate)
+        except self.backend.errors:
+            consumed = None
+        # Fail open: a slow or unreachable store must not take the API down with it.
+        return consumed or (True, float(capacity), 0.0)
+
+    def _consume(self, key: str, capacity: int, refill_rate: float) -> Optional[Tuple[bool, float, float]]:
+        lock_key = f"{ key }:lock"
+        for _ in range(self.lock_attempts):
+            if self.backend.add(lock_key, b"1", 1):
+                break
+            time.sleep(0.001)
+        else:
+            return None
+        try:
+            now = self.clock()
+            state = self.backend.get(key)
+            tokens = float(capacity)
+            if state is not None:
+                stored_tokens, updated_at = map(float, state.split(b":"))
+                tokens = min(capacity, stored_tokens + (now - updated_at) * refill_rate)
+            allowed, tokens, reset = _take(tokens, capacity, refill_rate)
+            self.backend.set(key, f"{ tokens }:{ now }".encode(), max(reset, 1))
+            return allowed, tokens, reset
+        finally:
+            self.backend.delete(lock_key)
+
+
+class RateLimiter:
+    """Per-route token buckets keyed by user id or client IP.
+
+    Routes are limited only when their endpoint appears in RATELIMIT_RULES.
+    """
+
+    def __init__(self, app: Any = None) -> None:
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Any) -> None:
+        if app.config["RATELIMIT_BACKEND"] == "memory":
+            store = MemoryBucketStore(app.config["RATELIMIT_MAX_KEYS"])
+        elif app.config["RATELIMIT_BACKEND"] == "redis":
+            store = SharedBucketStore(
+                RedisBackend.from_url(app.config["CACHE_REDIS_URL"], app.config["CACHE_KEY_PREFIX"])
+            )
+        else:
+            raise ValueError(f"Unknown rate limit backend: { app.config['RATELIMIT_BACKEND'] }")
+        app.extensions["rate_limiter"] = store
+        app.after_request(self._add_headers)
+
+    def check(self, identity: Optional[Any] = None) -> Optional[Tuple[dict, int, dict]]:
+        """Take a token for the current request, return an error response when out of them."""
+        config = current_app.config
+        rule = config["RATELIMIT_RULES"].get(request.endpoint)
+        if not config["RATELIMIT_ENABLED"] or rule is None:
+            return None
+        capacity, refill_rate = parse_rule(rule)
+        client = f"user:{ identity }" if identity is not None else f"ip:{ request.remote_addr }"
+        key = f"ratelimit:{ request.endpoint }:{ client }"
+        store = current_app.extensions["rate_limiter"]
+        allowed, remaining, reset = store.consume(key, capacity, refill_rate)
+        g.rate_limit = (capacity, int(remaining), math.ceil(reset))
+        if allowed:
+            return None
+        retry_after = math.ceil((1 - remaining) / refill_rate)
+        return {"message": "Too many requests"}, 429, {"Retry-After": str(retry_after)}
+
+    def limit(self, function: Any) -> Any:
+        """Limit a route that has no user by client IP."""
+
+        @wraps(function)
+        def decorator(*args: Any, **kwargs: Any) -> Any:
+            return self.check() or function(*args, **kwargs)
+
+        return decorator
+
+    @staticmethod
+    def _add_headers(response: Any) -> Any:
+        rate_limit = g.pop("rate_limit", None)
+        if rate_limit is not None:
+            limit, remaining, reset = rate_limit
+            response.headers["RateLimit-Limit"] = str(limit)
+            response.headers["RateLimit-Remaining"] = str(remaining)
+            response.headers["RateLimit-Reset"] = str(reset)
+        return response
@@ -0,0 +1,107 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Any, Iterable
+
+from flask import current_app
+from sqlalchemy import delete, select
+
+
+class BloomFilter:
+    """Fixed size set of strings with false positives but no false negatives."""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str) -> Iterable[int]:
+        # Double hashing: k positions out of one 128 bit digest.
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, value: str) -> None:
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class RevocationList:
+    """Revoked access token ids, checked through a per-worker Bloom filter.
+
+    Only filter hits are confirmed against the revoked_tokens table. The filter
+    is rebuilt from the table every REVOCATION_REFRESH_SECONDS, which is how
+    revocations made by other workers arrive, and rows of tokens that expired
+    anyway are pruned every REVOCATION_PRUNE_SECONDS.
+    """
+
+    def __init__(self, app: Any = None) -> None:
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Any) -> None:
+        app.extensions["revocation"] = {
+            "lock": threading.Lock(),
+            "filter": self._new_filter(app.config),
+            "refreshed_at": None,
+            "pruned_at": time.monotonic(),
+        }
+
+    @staticmethod
+    def _new_filter(config: Any) -> BloomFilter:
+        return BloomFilter(config["REVOCATION_FILTER_CAPACITY"], config["REVOCATION_FILTER_ERROR_RATE"])
+
+    def is_revoked(self, jti: str) -> bool:
+        # Imported here, api_app imports this module before db exists.
+        from . import db
+        from .models import RevokedToken
+
+        state = current_app.extensions["revocation"]
+        refreshed_at = state["refreshed_at"]
+        if refreshed_at is None or time.monotonic() - refreshed_at >= current_app.config["REVOCATION_REFRESH_SECONDS"]:
+            self.refresh(blocking=False)
+        if jti not in state["filter"]:
+            return False
+        return db.session.execute(select(RevokedToken.id).where(RevokedToken.jti == jti)).first() is not None
+
+    def revoke(self, jti: str, expires_at: datetime) -> None:
+        """Add the row to the session, the caller commits it."""
+        from . import db
+        from .models import RevokedToken
+
+        db.session.add(RevokedToken(jti=jti, expires_at=expires_at))
+        state = current_app.extensions["revocation"]
+        # A filter hit for a row that ends up rolled back only costs a lookup.
+        with state["lock"]:
+            state["filter"].add(jti)
+
+    def refresh(self, blocking: bool = True) -> None:
+        from . import db
+        from .models import RevokedToken
+
+        state = current_app.extensions["revocation"]
+        if not state["lock"].acquire(blocking=blocking):
+            # Another thread is rebuilding, keep answering from the old filter.
+            return
+        try:
+            config = current_app.config
+            now, started = datetime.utcnow(), time.monotonic()
+            # Own connections, so a check never touches the request's session.
+            engine = db.get_engine()
+            if started - state["pruned_at"] >= config["REVOCATION_PRUNE_SECONDS"]:
+                with engine.begin() as connection:
+                    connection.execute(delete(RevokedToken.__table__).where(RevokedToken.expires_at < now))
+                state["pruned_at"] = started
+            revoked_filter = self._new_filter(config)
+            with engine.connect() as connection:
+                for jti in connection.execute(select(RevokedToken.jti).where(RevokedToken.expires_at >= now)).scalars():
+                    revoked_filter.add(jti)
+            state["filter"], state["refreshed_at"] = revoked_filter, started
+        finally:
+            state["lock"].release()
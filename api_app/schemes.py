@@ -1,6 +1,8 @@
-from marshmallow import Schema, fields
+from typing import Optional, Tuple, Type
 
-from marshmallow.validate import Length, Range
+from marshmallow import Schema, ValidationError, fields
+
+from marshmallow.validate import Length, OneOf, Range
 
 
 class ItemSchema(Schema):
@@ -19,3 +21,32 @@ class UserSchema(Schema):
 class NewUserSchema(Schema):
     new_username = fields.Str(required=True, validate=Length(5))
     item_id = fields.Int(required=True, validate=Range(1))
+
+
+class RefreshTokenSchema(Schema):
+    refresh_token = fields.Str(required=True)
+
+
+class BatchOperationSchema(Schema):
+    method = fields.Str(required=True, validate=OneOf(["GET", "POST", "DELETE"]))
+    path = fields.Str(required=True, validate=Length(1))
+    body = fields.Raw(allow_none=True)
+
+
+class BatchSchema(Schema):
+    operations = fields.List(fields.Nested(BatchOperationSchema), required=True, validate=Length(1))
+    stop_on_error = fields.Bool(load_default=False)
+
+
+def parse_fields(schema_class: Type[Schema], value: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Parse a ``fields=a,b`` query parameter into names the schema can dump."""
+    if value is None:
+        return None
+    names = tuple(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+    if not names:
+        raise ValidationError({"fields": ["Field list is empty."]})
+    declared = schema_class._declared_fields
+    unknown = {name: ["Unknown field."] for name in names if name not in declared or declared[name].load_only}
+    if unknown:
+        raise ValidationError({"fields": unknown})
+    return names
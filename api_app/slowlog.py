@@ -0,0 +1,157 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from flask import current_app, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+slow_query_logger = logging.getLogger("api_app.slow_query")
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\(\s*(?:\?|%s|:\w+)(?:\s*,\s*(?:\?|%s|:\w+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAIN = {"sqlite": "EXPLAIN QUERY PLAN ", "mysql": "EXPLAIN ", "postgresql": "EXPLAIN "}
+
+
+def fingerprint(statement: str) -> str:
+    """Hash a statement with literals and IN lists collapsed, so repeats aggregate."""
+    normalized = _LITERALS.sub("?", statement)
+    normalized = _PLACEHOLDER_LISTS.sub("(?+)", normalized)
+    normalized = _WHITESPACE.sub(" ", normalized).strip().lower()
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def parameter_shape(parameters: Any, executemany: bool) -> Any:
+    """Types of the bound parameters, never their values."""
+    if executemany:
+        parameters = list(parameters)
+        return {"rows": len(parameters), "row": parameter_shape(parameters[0], False) if parameters else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+
+class SlowQueryLog:
+    """Logs statements slower than SLOW_QUERY_THRESHOLD_MS with their EXPLAIN plan.
+
+    Slow statements are aggregated by fingerprint and each fingerprint is
+    logged (and explained) at most once per SLOW_QUERY_LOG_INTERVAL_SECONDS.
+    Past SLOW_QUERY_MAX_FINGERPRINTS the least recently logged fingerprint
+    makes room for a new one.
+    """
+
+    def __init__(self, app: Any = None) -> None:
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Any) -> None:
+        app.extensions["slow_queries"] = {"lock": threading.Lock(), "stats": OrderedDict()}
+
+    @staticmethod
+    def stats() -> Dict[str, Dict[str, Any]]:
+        state = current_app.extensions["slow_queries"]
+        with state["lock"]:
+            return {key: dict(value) for key, value in state["stats"].items()}
+
+    @staticmethod
+    def record(conn: Any, cursor: Any, statement: str, parameters: Any, executemany: bool, duration: float) -> None:
+        config = current_app.config
+        state = current_app.extensions["slow_queries"]
+        key = fingerprint(statement)
+        now = time.monotonic()
+        duration_ms = duration * 1000
+        with state["lock"]:
+            stats = state["stats"].get(key)
+            if stats is None:
+                # Ordered by last log, the front is the least recently logged.
+                while state["stats"] and len(state["stats"]) >= config["SLOW_QUERY_MAX_FINGERPRINTS"]:
+                    state["stats"].popitem(last=False)
+                stats = state["stats"][key] = {
+                    "statement": statement,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "suppressed": 0,
+                    "logged_at": None,
+                }
+            stats["count"] += 1
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            if stats["logged_at"] is not None and now - stats["logged_at"] < config["SLOW_QUERY_LOG_INTERVAL_SECONDS"]:
+                stats["suppressed"] += 1
+                return
+            suppressed, stats["suppressed"], stats["logged_at"] = stats["suppressed"], 0, now
+            state["stats"].move_to_end(key)
+            count = stats["count"]
+        plan = None
+        if config["SLOW_QUERY_EXPLAIN"] and not executemany:
+            plan = _explain(conn, statement, parameters)
+        slow_query_logger.warning(
+            "Slow query %s took %.1fms",
+            key,
+            duration_ms,
+            extra={
+                "fingerprint": key,
+                "duration_ms": round(duration_ms, 3),
+                "statement": statement,
+                "parameter_shape": parameter_shape(parameters, executemany),
+                "route": request.endpoint if has_request_context() else None,
+                "explain": plan,
+                "count": count,
+                "suppressed": suppressed,
+            },
+        )
+
+
+def _explain(conn: Any, statement: str, parameters: Any) -> Optional[List[Any]]:
+    prefix = _EXPLAIN.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().lower().startswith("select"):
+        return None
+    # A raw DBAPI cursor on the same connection: same session state, and no
+    # engine events, so the EXPLAIN is not itself timed and logged.
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [list(row) for row in cursor.fetchall()]
+    except Exception as err:
+        return [f"EXPLAIN failed: { err }"]
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    started = conn.info.get("slow_query_started")
+    if not started:
+        return
+    duration = time.perf_counter() - started.pop()
+    if not has_app_context() or "slow_queries" not in current_app.extensions:
+        return
+    threshold = current_app.config["SLOW_QUERY_THRESHOLD_MS"]
+    if threshold is not None and duration * 1000 >= threshold:
+        SlowQueryLog.record(conn, cursor, statement, parameters, executemany, duration)
+
+
+def _handle_error(exception_context: Any) -> None:
+    connection = exception_context.connection
+    started = connection.info.get("slow_query_started") if connection is not None else None
+    if started:
+        started.pop()
+
+
+event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+event.listen(Engine, "handle_error", _handle_error)
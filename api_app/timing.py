@@ -0,0 +1,107 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+access_logger = logging.getLogger("api_app.access")
+
+# Phases overlap on purpose: "auth" includes its user lookup, which is also
+# counted in "db".
+PHASES = ("auth", "validation", "db", "serialization")
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    timings = g.get("server_timing") if has_app_context() else None
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+
+def _before_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    if has_app_context() and g.get("server_timing") is not None:
+        conn.info.setdefault("server_timing_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    started = conn.info.get("server_timing_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    timings = g.get("server_timing") if has_app_context() else None
+    if timings is not None:
+        timings["db"] = timings.get("db", 0.0) + elapsed
+        g.server_timing_queries = g.get("server_timing_queries", 0) + 1
+
+
+def _handle_error(exception_context: Any) -> None:
+    started = exception_context.connection.info.get("server_timing_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+event.listen(Engine, "handle_error", _handle_error)
+
+
+class ServerTiming:
+    """Per-phase request timings as a Server-Timing header and access log fields."""
+
+    def __init__(self, app: Any = None) -> None:
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Any) -> None:
+        app.before_request(self._start)
+        app.after_request(self._emit)
+
+    @staticmethod
+    def _start() -> None:
+        if not current_app.config["SERVER_TIMING_ENABLED"]:
+            return
+        g.server_timing = {}
+        g.server_timing_started = time.perf_counter()
+
+    @staticmethod
+    def _emit(response: Any) -> Any:
+        timings = g.pop("server_timing", None)
+        if timings is None:
+            return response
+        total = time.perf_counter() - g.pop("server_timing_started")
+        queries = g.pop("server_timing_queries", 0)
+        metrics = [f"{ name };dur={ timings[name] * 1000:.2f}" for name in PHASES if name in timings]
+        metrics.append(f"total;dur={ total * 1000:.2f}")
+        response.headers.add("Server-Timing", ", ".join(metrics))
+        fields = {f"{ name }_ms": round(timings.get(name, 0.0) * 1000, 3) for name in PHASES}
+        access_logger.info(
+            "%s %s %s %.2fms",
+            request.method,
+            request.path,
+            response.status_code,
+            total * 1000,
+            extra={
+                "method": request.method,
+                "path": request.path,
+                "endpoint": request.endpoint,
+                "status": response.status_code,
+                "total_ms": round(total * 1000, 3),
+                "db_queries": queries,
+                **fields,
+            },
+        )
+        return response
@@ -1,20 +1,36 @@
+import json
+import time
+import uuid
 from datetime import datetime, timedelta
 from functools import wraps
 from typing import Any, Callable
 
 import jwt
-from flask import Blueprint, request, url_for, wrappers, current_app
-from marshmallow import ValidationError
-from . import db
-from .models import Item, User
-from .schemes import ItemSchema, NewUserSchema, UserSchema
+from flask import Blueprint, g, request, url_for, wrappers, current_app
+from marshmallow import EXCLUDE, ValidationError
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+from . import cache, db, event_feed, limiter, ownership, queries, revocation
+from .idempotency import idempotent
+from .timing import phase
+from .warmup import pool_stats
+from .models import Item, RefreshToken, User, commit
+from .schemes import BatchSchema, ItemSchema, NewUserSchema, RefreshTokenSchema, UserSchema, parse_fields
 
 api_blueprint = Blueprint("api", __name__)
 
+# Streaming routes run outside the batch transaction, so they can't be batched.
+BATCH_EXCLUDED_ENDPOINTS = ("api.batch", "api.events", "api.export_items", "api.import_items")
+
 
 def token_required(function: Any) -> Any:
     @wraps(function)
     def decorator(*args: Any, **kwargs: Any) -> Callable:
+        # Operations of a batch request reuse the batch's authentication, but
+        # are still charged against their own route's rate limit.
+        batch_user = g.get("batch_user")
+        if batch_user is not None:
+            return limiter.check(batch_user.username) or function(batch_user, *args, **kwargs)
         token = None
         if "x-access-tokens" in request.headers:
             token = request.headers["x-access-tokens"]
@@ -22,11 +38,21 @@ def token_required(function: Any) -> Any:
         if not token:
             return {"message": "Token is missing"}, 403
 
-        try:
-            data = jwt.decode(token, current_app.config["SECRET_KEY"], algorithms=["HS256"])
-            current_user = User.query.filter_by(username=data.get("username")).first()
-        except jwt.exceptions.InvalidTokenError:
-            return {"message": "Token is invalid"}, 403
+        with phase("auth"):
+            try:
+                data = jwt.decode(token, current_app.config["SECRET_KEY"], algorithms=["HS256"])
+            except jwt.exceptions.InvalidTokenError:
+                return {"message": "Token is invalid"}, 403
+            # The signature is verified, so throttle on the claimed user before
+            # paying for the user lookup.
+            limited = limiter.check(data.get("username"))
+            if limited:
+                return limited
+            # Tokens minted before jti claims existed can't be revoked, they
+            # simply run out.
+            if data.get("jti") and revocation.is_revoked(data["jti"]):
+                return {"message": "Token is revoked"}, 403
+            current_user = queries.user_by_username(data.get("username"))
         if not current_user:
             return {"message": "Тoken does not belong to any user"}, 403
         return function(current_user, *args, **kwargs)
@@ -34,6 +60,18 @@ def token_required(function: Any) -> Any:
     return decorator
 
 
+def create_auth_token(username: str) -> str:
+    return jwt.encode(
+        {
+            "exp": datetime.utcnow()
+            + timedelta(seconds=current_app.config["AUTH_TOKEN_PERIOD_EXPIRE_SECONDS"]),
+            "username": username,
+            "jti": uuid.uuid4().hex,
+        },
+        current_app.config["SECRET_KEY"],
+    )
+
+
 @api_blueprint.app_errorhandler(500)
 def internal_server_error(e):
     return {"message": "Internal Server Error"}, 500
@@ -49,86 +87,249 @@ def send_bad_request(e):
     return {"message": "400 Bad Request: The browser (or proxy) sent a request that this server could not understand"}, 400
 
 
+@api_blueprint.route("/api/v1/ready", methods=["GET"])
+def readiness() -> wrappers.Response:
+    warmup = current_app.extensions["warmup"]
+    result = {
+        "ready": warmup["warmed"],
+        "warmup": warmup,
+        "pool": pool_stats(db.get_engine().pool),
+        "statement_cache": queries.statement_cache_stats.as_dict(),
+    }
+    return result, 200 if warmup["warmed"] else 503
+
+
 @api_blueprint.route("/api/v1/items", methods=["GET"])
 @token_required
 def index(user: User) -> wrappers.Response:
-    raw_items = Item.query.filter_by(user_id=user.id).all()
-    item_schema = ItemSchema(many=True)
-    items = item_schema.dump(raw_items)
-    return {"items": items}
+    try:
+        with phase("validation"):
+            fields = parse_fields(ItemSchema, request.args.get("fields"))
+    except ValidationError as err:
+        return {"message": f"{ err.messages }"}, 422
+
+    def build() -> bytes:
+        if fields:
+            raw_items = queries.item_columns_by_user(user.id, fields)
+        else:
+            raw_items = queries.items_by_user(user.id)
+        with phase("serialization"):
+            item_schema = ItemSchema(many=True, only=fields)
+            items = item_schema.dump(raw_items)
+            return json.dumps({"items": items}).encode()
+
+    return current_app.response_class(
+        cache.get_or_build(user.id, build, ",".join(fields or ())), mimetype="application/json"
+    )
 
 
 @api_blueprint.route("/api/v1/items/new", methods=["POST"])
 @token_required
+@idempotent
 def create_item(user: User) -> wrappers.Response:
+    try:
+        with phase("validation"):
+            fields = parse_fields(ItemSchema, request.args.get("fields"))
+    except ValidationError as err:
+        return {"message": f"{ err.messages }"}, 422
     item_schema = ItemSchema()
     json_data = request.get_json()
     try:
-        data = item_schema.load(json_data)
+        with phase("validation"):
+            data = item_schema.load(json_data)
     except ValidationError as err:
         return {"message": f"{ err.messages }"}, 422
     item_name = data["name"]
     item = Item(name=item_name, user_id=user.id)
     item.create()
-    result = item_schema.dump(Item.query.get(item.id))
+    cache.invalidate(user.id)
+    ownership.set(item.id, user.id)
+    raw_item = queries.item_columns_by_id(item.id, fields)
+    with phase("serialization"):
+        result = ItemSchema(only=fields).dump(raw_item)
     return {"item": result}, 200
 
 
+@api_blueprint.route("/api/v1/items/export", methods=["GET"])
+@token_required
+def export_items(user: User) -> wrappers.Response:
+    # The generator outlives the request's app context, so it pushes its own
+    # one and opens a fresh session for the server-side cursor.
+    app = current_app._get_current_object()
+    user_id = user.id
+
+    def generate():
+        with app.app_context():
+            item_schema = ItemSchema()
+            raw_items = (
+                Item.live()
+                .filter_by(user_id=user_id)
+                .order_by(Item.id)
+                .execution_options(stream_results=True)
+                .yield_per(app.config["EXPORT_YIELD_PER"])
+            )
+            for item in raw_items:
+                yield json.dumps(item_schema.dump(item)) + "\n"
+
+    return app.response_class(generate(), mimetype="application/x-ndjson")
+
+
+@api_blueprint.route("/api/v1/items/import", methods=["POST"])
+@token_required
+def import_items(user: User) -> wrappers.Response:
+    # Exported lines carry dump-only "id" and "user_id", imported items always
+    # get fresh ids and belong to the importing user.
+    item_schema = ItemSchema(unknown=EXCLUDE)
+    app = current_app._get_current_object()
+    stream = request.stream
+    user_id = user.id
+
+    def generate():
+        with app.app_context():
+            yield from _import_lines(
+                _bounded_lines(stream, app.config["IMPORT_MAX_LINE_BYTES"]),
+                item_schema,
+                user_id,
+                app.config["IMPORT_CHUNK_SIZE"],
+            )
+
+    return app.response_class(generate(), mimetype="application/x-ndjson")
+
+
+def _bounded_lines(stream: Any, max_length: int) -> Any:
+    """Lines of at most max_length bytes, None in place of a longer one."""
+    while True:
+        line = stream.readline(max_length + 1)
+        if not line:
+            return
+        if len(line) > max_length and not line.endswith(b"\n"):
+            # Drop the rest of it without holding more than max_length at once.
+            while line and not line.endswith(b"\n"):
+                line = stream.readline(max_length + 1)
+            line = None
+        yield line
+
+
+def _import_lines(lines: Any, item_schema: ItemSchema, user_id: int, chunk_size: int) -> Any:
+    chunk, imported, failed, line_number = [], 0, 0, 0
+    for line_number, line in enumerate(lines, start=1):
+        if line is None:
+            failed += 1
+            yield json.dumps({"error": {"line": line_number, "message": "Line is too long"}}) + "\n"
+            continue
+        if not line.strip():
+            continue
+        try:
+            data = item_schema.load(json.loads(line))
+        except ValidationError as err:
+            failed += 1
+            yield json.dumps({"error": {"line": line_number, "message": f"{ err.messages }"}}) + "\n"
+            continue
+        except ValueError:
+            failed += 1
+            yield json.dumps({"error": {"line": line_number, "message": "Invalid JSON"}}) + "\n"
+            continue
+        chunk.append({"name": data["name"], "user_id": user_id})
+        if len(chunk) >= chunk_size:
+            db.session.bulk_insert_mappings(Item, chunk)
+            commit()
+            cache.invalidate(user_id)
+            imported += len(chunk)
+            chunk = []
+            yield json.dumps(
+                {"progress": {"lines": line_number, "imported": imported, "failed": failed}}
+            ) + "\n"
+    if chunk:
+        db.session.bulk_insert_mappings(Item, chunk)
+        commit()
+        cache.invalidate(user_id)
+        imported += len(chunk)
+    yield json.dumps({"result": {"lines": line_number, "imported": imported, "failed": failed}}) + "\n"
+
+
 @api_blueprint.route("/api/v1/items/<id>", methods=["DELETE"])
 @token_required
 def delete_item(user: User, id: int) -> wrappers.Response:
-    item = Item.query.get(id)
+    item = Item.live().filter_by(id=id).first()
     if not item:
         return {"message": "No item with such id"}, 422
-    check_user = User.query.filter(User.items.any(Item.id == id)).first()
-    if not check_user == user:
+    if not item.user_id == user.id:
         return {"message": "This user can,t delete this item"}, 403
-    db.session.delete(item)
-    db.session.commit()
+    # A tombstone instead of a DELETE, purge_items.py removes the row later
+    # and until then the owner can restore it.
+    item.deleted_at = datetime.utcnow()
+    commit()
+    cache.invalidate(user.id)
+    ownership.set(item.id, None)
     return {"item": f"Item: { item.name } deleted"}, 200
 
 
+@api_blueprint.route("/api/v1/items/<id>/restore", methods=["POST"])
+@token_required
+def restore_item(user: User, id: int) -> wrappers.Response:
+    undelete_after = datetime.utcnow() - timedelta(seconds=current_app.config["ITEM_UNDELETE_SECONDS"])
+    item = Item.query.filter(
+        Item.id == id, Item.user_id == user.id, Item.deleted_at.isnot(None), Item.deleted_at >= undelete_after
+    ).first()
+    if not item:
+        return {"message": "No deleted item with such id"}, 422
+    item.deleted_at = None
+    commit()
+    cache.invalidate(user.id)
+    ownership.set(item.id, user.id)
+    with phase("serialization"):
+        result = ItemSchema().dump(item)
+    return {"item": result}, 200
+
+
 @api_blueprint.route("/api/v1/send", methods=["POST"])
 @token_required
+@idempotent
 def send_item(user: User) -> wrappers.Response:
     json_data = request.get_json()
     new_user_schema = NewUserSchema()
     try:
-        data = new_user_schema.load(json_data)
+        with phase("validation"):
+            data = new_user_schema.load(json_data)
     except ValidationError as err:
         return {"message": f"{ err.messages }"}, 422
     item_id, new_username = data["item_id"], data["new_username"]
-    check_users = User.query.filter_by(username=new_username).all()
-    if not check_users:
+    new_user_id = queries.user_id_by_username(new_username)
+    if not new_user_id:
         return {"message": "No destination user"}, 422
-    check_items = Item.query.filter_by(id=item_id).all()
-    if not check_items:
+    # One owner lookup, usually answered by the ownership index, covers the
+    # remaining three checks.
+    owner_id = ownership.owner(item_id)
+    if owner_id is None:
         return {"message": "No item with such id"}, 422
-    user_items = User.query.filter(
-        User.username == user.username, User.items.any(Item.id == item_id)
-    ).all()
-    if not user_items:
+    if owner_id != user.id:
         return {"message": "Item not belong to user"}, 403
-    new_user_items = User.query.filter(
-        User.username == new_username, User.items.any(Item.id == item_id)
-    ).all()
-    if new_user_items:
+    if owner_id == new_user_id:
         return {"message": "User already has this item"}, 422
     move_token = jwt.encode(
         {
             "item_id": item_id,
             "new_username": new_username,
+            "from_user_id": user.id,
         },
         current_app.config["SECRET_KEY"],
     )
     move_url = url_for(".get_item", move_token=move_token, _external=True)
+    event_feed.publish(
+        new_user_id, "transfer_offered", {"item_id": item_id, "from": user.username, "move_url": move_url}
+    )
     return {"move_url": move_url}, 200
 
 
 @api_blueprint.route("/api/v1/get/<move_token>", methods=["GET"])
 @token_required
 def get_item(user: User, move_token: str) -> wrappers.Response:
-    item_schema = ItemSchema()
+    try:
+        with phase("validation"):
+            fields = parse_fields(ItemSchema, request.args.get("fields"))
+    except ValidationError as err:
+        return {"message": f"{ err.messages }"}, 422
+    item_schema = ItemSchema(only=fields)
     try:
         move_token_data = jwt.decode(
             move_token, current_app.config["SECRET_KEY"], algorithms=["HS256"]
@@ -140,27 +341,86 @@ def get_item(user: User, move_token: str) -> wrappers.Response:
     )
     if not user.username == new_username:
         return {"message": "Another user token"}, 403
-    new_user = User.query.filter_by(username=new_username).one()
-    item = Item.query.get(item_id)
+    item = Item.live().filter_by(id=item_id).first()
     if not item:
         return {"message": "Item is not found"}, 422
-    user_items = User.query.filter(
-        User.username == new_username, User.items.any(Item.id == item_id)
-    ).all()
-    if user_items:
+    # The row is authoritative here, the index that validated the send may
+    # have lagged behind, so the sender must still own the item. Urls made
+    # before the sender was part of the token don't carry it.
+    if item.user_id == user.id:
         return {"message": "User already has this item or reuse url"}, 422
-    item.user_id = new_user.id
-    db.session.commit()
-    result = item_schema.dump(Item.query.get(item.id))
+    from_user_id = move_token_data.get("from_user_id")
+    if from_user_id is not None and item.user_id != from_user_id:
+        return {"message": "Move url is outdated"}, 422
+    old_user_id = item.user_id
+    item.user_id = user.id
+    commit()
+    cache.invalidate(old_user_id, user.id)
+    ownership.set(item.id, user.id)
+    event_feed.publish(old_user_id, "transfer_completed", {"item_id": item.id, "to": user.username})
+    raw_item = queries.item_columns_by_id(item.id, fields)
+    with phase("serialization"):
+        result = item_schema.dump(raw_item)
     return {"user": result}, 200
 
 
+@api_blueprint.route("/api/v1/events", methods=["GET"])
+@token_required
+def events(user: User) -> wrappers.Response:
+    try:
+        after_id = int(request.headers.get("Last-Event-ID") or request.args.get("after", 0))
+    except ValueError:
+        return {"message": "Event id must be an integer"}, 422
+    config, user_id = current_app.config, user.id
+    broker = current_app.extensions["events"]
+    # Waiting for events must not hold a pooled connection.
+    db.session.close()
+    if "text/event-stream" not in request.headers.get("Accept", ""):
+        # Long-poll fallback: answer as soon as there is something, or empty
+        # on timeout, the client asks again with the last id it saw.
+        if config["EVENTS_WAIT_ENABLED"]:
+            found = broker.wait(user_id, after_id, config["EVENTS_POLL_TIMEOUT_SECONDS"])
+        else:
+            found = broker.fetch(user_id, after_id)
+        return {"events": found, "last_id": found[-1]["id"] if found else after_id}, 200
+
+    def format_event(event):
+        return f"id: { event['id'] }\nevent: { event['type'] }\ndata: { json.dumps(event['data']) }\n\n"
+
+    def generate():
+        # Streams end after EVENTS_STREAM_SECONDS, EventSource reconnects on its
+        # own and resumes from Last-Event-ID.
+        deadline = time.monotonic() + config["EVENTS_STREAM_SECONDS"]
+        last_id = after_id
+        yield f"retry: { config['EVENTS_RETRY_MILLISECONDS'] }\n\n"
+        if not config["EVENTS_WAIT_ENABLED"]:
+            # Only what is pending, the client reconnects after the retry delay.
+            yield from map(format_event, broker.fetch(user_id, last_id))
+            return
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            found = broker.wait(user_id, last_id, min(remaining, config["EVENTS_HEARTBEAT_SECONDS"]))
+            if not found:
+                yield ": keepalive\n\n"
+            for event in found:
+                last_id = event["id"]
+                yield format_event(event)
+
+    return current_app.response_class(
+        generate(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @api_blueprint.route("/api/v1/user/registration", methods=["POST"])
+@limiter.limit
 def create_user() -> wrappers.Response:
     user_schema = UserSchema()
     json_data = request.get_json()
     try:
-        data = user_schema.load(json_data)
+        with phase("validation"):
+            data = user_schema.load(json_data)
     except ValidationError as err:
         return {"message": f"{ err.messages }"}, 422
     username, password = data["username"], data["password"]
@@ -169,16 +429,20 @@ def create_user() -> wrappers.Response:
         return {"message": "User already exist"}, 422
     user = User(username=username, password=password)
     user.create()
-    result = user_schema.dump(User.query.get(user.id))
+    raw_user = User.query.get(user.id)
+    with phase("serialization"):
+        result = user_schema.dump(raw_user)
     return {"user": result}, 200
 
 
 @api_blueprint.route("/api/v1/user/login", methods=["POST"])
+@limiter.limit
 def login_user() -> wrappers.Response:
     user_schema = UserSchema()
     json_data = request.get_json()
     try:
-        data = user_schema.load(json_data)
+        with phase("validation"):
+            data = user_schema.load(json_data)
     except ValidationError as err:
         return {"message": f"{ err.messages }"}, 422
     username, password = data["username"], data["password"]
@@ -186,13 +450,137 @@ def login_user() -> wrappers.Response:
     if not user:
         return {"message": "User is not exist"}, 422
     if user.verify_password(password):
-        auth_token = jwt.encode(
-            {
-                "exp": datetime.utcnow()
-                + timedelta(seconds=current_app.config["AUTH_TOKEN_PERIOD_EXPIRE_SECONDS"]),
-                "username": user.username,
-            },
-            current_app.config["SECRET_KEY"],
+        auth_token = create_auth_token(user.username)
+        refresh_token = RefreshToken.issue(
+            user.id, current_app.config["REFRESH_TOKEN_PERIOD_EXPIRE_SECONDS"]
         )
-        return {"user": {"auth_token": auth_token}}, 200
+        commit()
+        return {"user": {"auth_token": auth_token, "refresh_token": refresh_token}}, 200
     return {"message": "Wrong password!"}, 403
+
+
+@api_blueprint.route("/api/v1/user/refresh", methods=["POST"])
+@limiter.limit
+def refresh_user_token() -> wrappers.Response:
+    refresh_token_schema = RefreshTokenSchema()
+    json_data = request.get_json()
+    try:
+        with phase("validation"):
+            data = refresh_token_schema.load(json_data)
+    except ValidationError as err:
+        return {"message": f"{ err.messages }"}, 422
+    found = RefreshToken.find(data["refresh_token"])
+    if not found:
+        return {"message": "Refresh token is invalid"}, 403
+    refresh_token, username = found
+    if refresh_token.expires_at < datetime.utcnow() and not refresh_token.revoked:
+        return {"message": "Refresh token is expired"}, 403
+    if not RefreshToken.rotate(refresh_token.id):
+        # A rotated token came back: it leaked, so drop the whole session.
+        RefreshToken.revoke_all(refresh_token.user_id)
+        commit()
+        return {"message": "Refresh token is revoked"}, 403
+    new_refresh_token = RefreshToken.issue(
+        refresh_token.user_id, current_app.config["REFRESH_TOKEN_PERIOD_EXPIRE_SECONDS"]
+    )
+    commit()
+    return {"user": {"auth_token": create_auth_token(username), "refresh_token": new_refresh_token}}, 200
+
+
+@api_blueprint.route("/api/v1/user/logout", methods=["POST"])
+def logout_user() -> wrappers.Response:
+    refresh_token_schema = RefreshTokenSchema()
+    json_data = request.get_json()
+    try:
+        with phase("validation"):
+            data = refresh_token_schema.load(json_data)
+    except ValidationError as err:
+        return {"message": f"{ err.messages }"}, 422
+    found = RefreshToken.find(data["refresh_token"])
+    if not found:
+        return {"message": "Refresh token is invalid"}, 403
+    refresh_token, username = found
+    refresh_token.revoked = True
+    # The access token of the session, when sent along, stops working too.
+    auth_token = request.headers.get("x-access-tokens")
+    if auth_token:
+        try:
+            auth_data = jwt.decode(auth_token, current_app.config["SECRET_KEY"], algorithms=["HS256"])
+        except jwt.exceptions.InvalidTokenError:
+            auth_data = {}
+        jti = auth_data.get("jti")
+        if auth_data.get("username") == username and jti and not revocation.is_revoked(jti):
+            revocation.revoke(jti, datetime.utcfromtimestamp(auth_data["exp"]))
+    commit()
+    return {"message": "Refresh token revoked"}, 200
+
+
+@api_blueprint.route("/api/v1/batch", methods=["POST"])
+@token_required
+def batch(user: User) -> wrappers.Response:
+    batch_schema = BatchSchema()
+    json_data = request.get_json()
+    try:
+        with phase("validation"):
+            data = batch_schema.load(json_data)
+    except ValidationError as err:
+        return {"message": f"{ err.messages }"}, 422
+    operations, stop_on_error = data["operations"], data["stop_on_error"]
+    max_operations = current_app.config["BATCH_MAX_OPERATIONS"]
+    if len(operations) > max_operations:
+        return {"message": f"Batch is limited to { max_operations } operations"}, 422
+    results = []
+    g.batch, g.batch_user = True, user
+    # Operations set their own rate limit state, the headers describe the batch.
+    rate_limit = g.get("rate_limit")
+    g.deferred_invalidations, g.deferred_events, g.deferred_ownership = set(), [], []
+    try:
+        for operation in operations:
+            status, body = _run_operation(operation)
+            results.append({"status": status, "body": body})
+            if stop_on_error and status >= 400:
+                break
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        deferred_invalidations, deferred_events = g.pop("deferred_invalidations"), g.pop("deferred_events")
+        deferred_ownership = g.pop("deferred_ownership")
+        g.batch, g.batch_user = False, None
+        if rate_limit is not None:
+            g.rate_limit = rate_limit
+    committed = not (stop_on_error and results[-1]["status"] >= 400)
+    if committed:
+        commit()
+        cache.invalidate(*deferred_invalidations)
+        for deferred_event in deferred_events:
+            event_feed.publish(*deferred_event)
+        for item_id, owner_id in deferred_ownership:
+            ownership.set(item_id, owner_id)
+    else:
+        db.session.rollback()
+        skipped = {"status": 424, "body": {"message": "Skipped after a failed operation"}}
+        results.extend(skipped for _ in operations[len(results):])
+    return {"results": results, "committed": committed}, 200
+
+
+def _run_operation(operation: dict) -> Any:
+    app = current_app._get_current_object()
+    environ = EnvironBuilder(
+        path=operation["path"],
+        base_url=request.host_url,
+        method=operation["method"],
+        json=operation.get("body"),
+        environ_base={"REMOTE_ADDR": request.remote_addr},
+    ).get_environ()
+    with app.request_context(environ):
+        try:
+            if request.endpoint in BATCH_EXCLUDED_ENDPOINTS:
+                return 422, {"message": "Operation is not allowed in a batch"}
+            rv = app.dispatch_request()
+        except HTTPException as err:
+            rv = app.handle_http_exception(err)
+        finally:
+            g.pop("rate_limit", None)
+        response = app.make_response(rv)
+    return response.status_code, response.get_json()
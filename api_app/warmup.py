@@ -0,0 +1,53 @@
+import time
+from typing import Any, Dict, List
+
+from . import db, queries, revocation
+
+
+def warm_up(app: Any) -> Dict[str, Any]:
+    """Fill the connection pool and run every hot statement once.
+
+    Called from gunicorn's post_worker_init, so the first real requests of a
+    new worker find open connections and compiled statements.
+    """
+    started = time.perf_counter()
+    with app.app_context():
+        engine = db.get_engine(app)
+        size = getattr(engine.pool, "size", lambda: 1)()
+        connections = [engine.connect() for _ in range(min(size, app.config["WARMUP_CONNECTIONS"]))]
+        for connection in connections:
+            connection.close()
+        queries.user_by_username("")
+        queries.user_id_by_username("")
+        queries.items_by_user(0)
+        queries.item_columns_by_user(0)
+        queries.item_columns_by_id(0)
+        queries.item_owner(0)
+        revocation.refresh()
+        db.session.remove()
+    state = {"warmed": True, "connections": len(connections), "seconds": round(time.perf_counter() - started, 4)}
+    app.extensions["warmup"] = state
+    return state
+
+
+def pool_stats(pool: Any) -> Dict[str, Any]:
+    stats = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if method is not None:
+            stats[name] = method()
+    return stats
+
+
+def process_local_settings(config: Any) -> List[str]:
+    """Enabled features whose state stays in one worker process with the "memory" backend."""
+    settings = []
+    if config["CACHE_BACKEND"] == "memory":
+        for name in ("CACHE_ENABLED", "OWNERSHIP_ENABLED"):
+            if config[name]:
+                settings.append(f"{ name } with CACHE_BACKEND=memory")
+    if config["RATELIMIT_ENABLED"] and config["RATELIMIT_BACKEND"] == "memory":
+        settings.append("RATELIMIT_BACKEND=memory")
+    if config["EVENTS_BACKEND"] == "memory":
+        settings.append("EVENTS_BACKEND=memory")
+    return settings
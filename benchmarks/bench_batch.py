@@ -0,0 +1,61 @@
+"""Compare N sequential item creations against one POST /api/v1/batch.
+
+Run from the repository root: python -m benchmarks.bench_batch
+"""
+import os
+import tempfile
+import time
+
+from api_app import create_app, db
+from flask import json
+
+OPERATIONS = 50
+ROUNDS = 10
+
+
+def main():
+    db_fb, db_path = tempfile.mkstemp()
+    app = create_app()
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    app.config["RATELIMIT_ENABLED"] = False
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    credentials = json.dumps({"username": "bench_user", "password": "123123"})
+    client.post("api/v1/user/registration", data=credentials, content_type="application/json")
+    response = client.post("api/v1/user/login", data=credentials, content_type="application/json")
+    headers = {"x-access-tokens": response.get_json()["user"]["auth_token"]}
+
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        for number in range(OPERATIONS):
+            client.post(
+                "api/v1/items/new",
+                data=json.dumps({"name": f"Sequential item { number }"}),
+                content_type="application/json",
+                headers=headers,
+            )
+    sequential = (time.perf_counter() - started) / ROUNDS
+
+    operations = [
+        {"method": "POST", "path": "/api/v1/items/new", "body": {"name": f"Batched item { number }"}}
+        for number in range(OPERATIONS)
+    ]
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        client.post(
+            "api/v1/batch",
+            data=json.dumps({"operations": operations}),
+            content_type="application/json",
+            headers=headers,
+        )
+    batched = (time.perf_counter() - started) / ROUNDS
+
+    print(f"{OPERATIONS} sequential creates: {sequential * 1000:.1f} ms")
+    print(f"one batch of {OPERATIONS}:      {batched * 1000:.1f} ms ({sequential / batched:.1f}x faster)")
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+if __name__ == "__main__":
+    main()
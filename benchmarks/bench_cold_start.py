@@ -0,0 +1,73 @@
+"""Measure worker cold start: app import, warm-up and first request latency.
+
+Every variant runs in a fresh interpreter so imports and pools start cold.
+Run from the repository root: python -m benchmarks.bench_cold_start
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROUNDS = 5
+
+
+def worker(db_path, warm):
+    started = time.perf_counter()
+    from api_app import create_app
+    from api_app.warmup import warm_up
+
+    app = create_app()
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    app.config["RATELIMIT_ENABLED"] = False
+    loaded = time.perf_counter()
+    if warm:
+        warm_up(app)
+    ready = time.perf_counter()
+    client = app.test_client()
+    headers = {"x-access-tokens": sys.argv[4]}
+    timings = []
+    for _ in range(2):
+        request_started = time.perf_counter()
+        client.get("api/v1/items", headers=headers)
+        timings.append(time.perf_counter() - request_started)
+    print(json.dumps({"load": loaded - started, "warm_up": ready - loaded, "first": timings[0], "second": timings[1]}))
+
+
+def main():
+    from api_app import create_app, db
+    from api_app.models import User
+    from api_app.views import create_auth_token
+
+    db_fb, db_path = tempfile.mkstemp()
+    app = create_app()
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    with app.test_request_context():
+        db.create_all()
+        User(username="bench_user", password="123123").create()
+        token = create_auth_token("bench_user")
+
+    for warm in (False, True):
+        runs = [
+            json.loads(
+                subprocess.check_output(
+                    [sys.executable, "-m", "benchmarks.bench_cold_start", "worker", db_path, str(int(warm)), token]
+                )
+            )
+            for _ in range(ROUNDS)
+        ]
+        averages = {key: sum(run[key] for run in runs) / ROUNDS * 1000 for key in runs[0]}
+        print(
+            f"{'warm' if warm else 'cold'}: load {averages['load']:.1f} ms, warm-up {averages['warm_up']:.1f} ms, "
+            f"first request {averages['first']:.1f} ms, second request {averages['second']:.1f} ms"
+        )
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "worker":
+        worker(sys.argv[2], sys.argv[3] == "1")
+    else:
+        main()
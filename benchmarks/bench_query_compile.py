@@ -0,0 +1,66 @@
+"""Per-call cost of the hot handler queries, rebuilt ORM queries vs. api_app.queries.
+
+Run from the repository root: python -m benchmarks.bench_query_compile
+"""
+import time
+
+from api_app import create_app, db, queries
+from api_app.models import Item, User
+
+ROUNDS = 5000
+
+
+def timed(function):
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        function()
+    return (time.perf_counter() - started) / ROUNDS * 1e6
+
+
+def main():
+    app = create_app()
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username="bench_user", password="123123"))
+        db.session.commit()
+        db.session.add_all([Item(name=f"Bench item { number }", user_id=1) for number in range(10)])
+        db.session.commit()
+
+        cases = [
+            (
+                "user by username",
+                lambda: User.query.filter_by(username="bench_user").first(),
+                lambda: queries.user_by_username("bench_user"),
+            ),
+            (
+                "items by user",
+                lambda: Item.query.filter_by(user_id=1).all(),
+                lambda: queries.items_by_user(1),
+            ),
+            (
+                "item owner",
+                lambda: db.session.query(Item.user_id).filter(Item.id == 5, Item.deleted_at.is_(None)).scalar(),
+                lambda: queries.item_owner(5),
+            ),
+        ]
+        print(f"{'query':<18}{'rebuilt (us)':>14}{'cached (us)':>14}")
+        for name, rebuilt, cached in cases:
+            print(f"{name:<18}{timed(rebuilt):>14.1f}{timed(cached):>14.1f}")
+
+        statement = queries.ITEM_OWNER
+        dialect = db.engine.dialect
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            statement.compile(dialect=dialect)
+        compile_cost = (time.perf_counter() - started) / ROUNDS * 1e6
+        print(f"compiling ITEM_OWNER without the cache: {compile_cost:.1f} us")
+
+        queries.statement_cache_stats.reset()
+        for _ in range(ROUNDS):
+            queries.item_owner(5)
+        print(f"statement cache: {queries.statement_cache_stats.as_dict()}")
+
+
+if __name__ == "__main__":
+    main()
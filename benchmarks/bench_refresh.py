@@ -0,0 +1,49 @@
+"""Compare the CPU cost of re-logging in against refreshing an access token.
+
+Run from the repository root: python -m benchmarks.bench_refresh
+"""
+import os
+import tempfile
+import time
+
+from api_app import create_app, db
+from flask import json
+
+ROUNDS = 50
+
+
+def main():
+    db_fb, db_path = tempfile.mkstemp()
+    app = create_app()
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    app.config["RATELIMIT_ENABLED"] = False
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    credentials = json.dumps({"username": "bench_user", "password": "123123"})
+    client.post("api/v1/user/registration", data=credentials, content_type="application/json")
+
+    started = time.process_time()
+    for _ in range(ROUNDS):
+        response = client.post("api/v1/user/login", data=credentials, content_type="application/json")
+    login_cpu = (time.process_time() - started) / ROUNDS
+
+    refresh_token = response.get_json()["user"]["refresh_token"]
+    started = time.process_time()
+    for _ in range(ROUNDS):
+        response = client.post(
+            "api/v1/user/refresh",
+            data=json.dumps({"refresh_token": refresh_token}),
+            content_type="application/json",
+        )
+        refresh_token = response.get_json()["user"]["refresh_token"]
+    refresh_cpu = (time.process_time() - started) / ROUNDS
+
+    print(f"login:   {login_cpu * 1000:.2f} ms CPU per call")
+    print(f"refresh: {refresh_cpu * 1000:.2f} ms CPU per call ({login_cpu / refresh_cpu:.0f}x cheaper)")
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+if __name__ == "__main__":
+    main()
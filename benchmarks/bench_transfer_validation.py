@@ -0,0 +1,107 @@
+"""Measure POST /api/v1/send validation latency with and without the ownership index.
+
+A background thread keeps moving items between users through send and get,
+while the main thread times transfer validations and counts their queries.
+Run from the repository root: python -m benchmarks.bench_transfer_validation
+"""
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from api_app import db
+from api_app.views import create_auth_token
+from flask import json
+from sqlalchemy import event
+
+from seed_db import app, seed
+
+USERS = 100
+ITEMS = 10
+REQUESTS = 3000
+
+
+def main():
+    db_fb, db_path = tempfile.mkstemp()
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    app.config["RATELIMIT_ENABLED"] = False
+    app.config["SERVER_TIMING_ENABLED"] = False
+    with app.test_request_context():
+        db.create_all()
+        seed(USERS, ITEMS, seed_value=1)
+        owners = dict(db.session.execute(db.text("SELECT id, user_id FROM items")).fetchall())
+        usernames = dict(db.session.execute(db.text("SELECT id, username FROM users")).fetchall())
+        tokens = {user_id: create_auth_token(username) for user_id, username in usernames.items()}
+        engine = db.get_engine(app)
+    client = app.test_client()
+    lock = threading.Lock()
+    main_thread = threading.get_ident()
+    queries = []
+
+    def count(*args):
+        if threading.get_ident() == main_thread:
+            queries.append(args[2])
+
+    event.listen(engine, "before_cursor_execute", count)
+
+    def send(rng):
+        item_id = rng.choice(list(owners))
+        with lock:
+            owner_id = owners[item_id]
+        new_owner_id = (owner_id + rng.randint(0, USERS - 2)) % USERS + 1
+        response = client.post(
+            "api/v1/send",
+            data=json.dumps({"new_username": usernames[new_owner_id], "item_id": item_id}),
+            content_type="application/json",
+            headers={"x-access-tokens": tokens[owner_id]},
+        )
+        return item_id, new_owner_id, response
+
+    for enabled in (False, True):
+        app.config["OWNERSHIP_ENABLED"] = enabled
+        stop = threading.Event()
+
+        def transfers():
+            rng = random.Random(2)
+            while not stop.is_set():
+                item_id, new_owner_id, response = send(rng)
+                if response.status_code == 200:
+                    client.get(response.get_json()["move_url"], headers={"x-access-tokens": tokens[new_owner_id]})
+                    with lock:
+                        owners[item_id] = new_owner_id
+
+        rng = random.Random(3)
+        # Every item validated once, so the index starts warm.
+        for item_id in list(owners):
+            with lock:
+                owner_id = owners[item_id]
+            client.post(
+                "api/v1/send",
+                data=json.dumps({"new_username": usernames[owner_id % USERS + 1], "item_id": item_id}),
+                content_type="application/json",
+                headers={"x-access-tokens": tokens[owner_id]},
+            )
+        mover = threading.Thread(target=transfers)
+        mover.start()
+        latencies = []
+        queries.clear()
+        for _ in range(REQUESTS):
+            started = time.perf_counter()
+            send(rng)
+            latencies.append(time.perf_counter() - started)
+        stop.set()
+        mover.join()
+        latencies.sort()
+        print(
+            f"ownership index {'on ' if enabled else 'off'}: median {statistics.median(latencies) * 1000:.2f} ms, "
+            f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.2f} ms, "
+            f"{len(queries) / REQUESTS:.2f} queries per validation"
+        )
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+if __name__ == "__main__":
+    main()
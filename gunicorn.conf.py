@@ -0,0 +1,55 @@
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+# GET /api/v1/events keeps requests open, "gevent" serves them from one
+# process. With "sync" or "gthread" the events endpoint doesn't wait, see
+# post_worker_init.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gevent")
+# Concurrent requests per gevent worker, each may hold a pooled connection.
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 1000))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+# Import the app once in the master, workers fork with it already loaded.
+preload_app = True
+
+if worker_class == "gevent":
+    # The app is preloaded, so patch before it imports threading and sockets.
+    from gevent import monkey
+
+    monkey.patch_all()
+
+
+def on_starting(server):
+    # Caches, rate limits and events kept in memory would diverge between
+    # workers, refuse to start rather than serve inconsistent answers.
+    if server.cfg.workers > 1:
+        from api_app.warmup import process_local_settings
+
+        settings = process_local_settings(server.app.wsgi().config)
+        if settings:
+            raise RuntimeError(
+                f"{ server.cfg.workers } workers need shared backends, got { ', '.join(settings) }. "
+                "Set them to redis or run GUNICORN_WORKERS=1."
+            )
+
+
+def post_fork(server, worker):
+    # Connections opened by the master before forking must not be shared by
+    # the workers, every worker starts with an empty pool of its own.
+    from api_app import db
+
+    app = server.app.wsgi()
+    with app.app_context():
+        db.get_engine(app).dispose()
+
+
+def post_worker_init(worker):
+    from api_app.warmup import warm_up
+
+    if worker.cfg.worker_class_str not in ("gevent", "eventlet"):
+        # A waiting events request would pin the worker until it times out.
+        worker.wsgi.config["EVENTS_WAIT_ENABLED"] = False
+    state = warm_up(worker.wsgi)
+    worker.log.info("Worker %s warmed up in %.3fs", worker.pid, state["seconds"])
@@ -0,0 +1,91 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from api_app import create_app, db
+from api_app.models import Item
+
+app = create_app()
+
+
+def parse_hours(value: str) -> Tuple[int, int]:
+    start, end = (int(hour) for hour in value.split("-"))
+    if not (0 <= start < 24 and 0 <= end < 24):
+        raise argparse.ArgumentTypeError(f"Hours must be within 0-23: { value }")
+    return start, end
+
+
+def in_quiet_hours(quiet_hours: Optional[Tuple[int, int]], now: datetime) -> bool:
+    if quiet_hours is None:
+        return True
+    start, end = quiet_hours
+    # "22-4" wraps around midnight.
+    if start <= end:
+        return start <= now.hour < end
+    return now.hour >= start or now.hour < end
+
+
+def purge(
+    batch_size: int = 1000,
+    undelete_seconds: Optional[float] = None,
+    pause: float = 0.0,
+    max_seconds: Optional[float] = None,
+    quiet_hours: Optional[Tuple[int, int]] = None,
+) -> Dict[str, Any]:
+    """Hard-delete tombstoned items past the undelete window, batch_size rows per transaction."""
+    if undelete_seconds is None:
+        undelete_seconds = app.config["ITEM_UNDELETE_SECONDS"]
+    cutoff = datetime.utcnow() - timedelta(seconds=undelete_seconds)
+    items_table = Item.__table__
+    due = items_table.c.deleted_at.isnot(None) & (items_table.c.deleted_at < cutoff)
+    stats = {"rows": 0, "batches": 0, "seconds": 0.0, "stopped": "done"}
+    started = time.perf_counter()
+    while True:
+        if not in_quiet_hours(quiet_hours, datetime.now()):
+            stats["stopped"] = "quiet_hours"
+            break
+        if max_seconds is not None and time.perf_counter() - started >= max_seconds:
+            stats["stopped"] = "max_seconds"
+            break
+        # Short transactions on a bounded set of ids, oldest tombstones first
+        # straight off ix_items_deleted_at, so the purge never holds locks long
+        # enough to stall transfers on the same rows.
+        ids = db.session.execute(
+            db.select(items_table.c.id).where(due).order_by(items_table.c.deleted_at).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        result = db.session.execute(items_table.delete().where(items_table.c.id.in_(ids), due))
+        db.session.commit()
+        stats["rows"] += result.rowcount
+        stats["batches"] += 1
+        elapsed = time.perf_counter() - started
+        print(f"{ stats['batches'] } batches, { stats['rows'] } rows, {stats['rows'] / elapsed:.0f} rows/s")
+        if len(ids) < batch_size:
+            break
+        time.sleep(pause)
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hard-delete tombstoned items past the undelete window.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause", type=float, default=0.1, help="seconds to sleep between batches")
+    parser.add_argument("--max-seconds", type=float, help="stop after this long, the next run continues")
+    parser.add_argument(
+        "--quiet-hours", type=parse_hours, help="local hours to run in, e.g. 1-5 or 22-4, stops outside of them"
+    )
+    args = parser.parse_args()
+    with app.app_context():
+        stats = purge(args.batch_size, None, args.pause, args.max_seconds, args.quiet_hours)
+    rate = stats["rows"] / stats["seconds"] if stats["seconds"] else 0
+    print(
+        f"Purged { stats['rows'] } items in { stats['batches'] } batches, {stats['seconds']:.2f}s "
+        f"({rate:.0f} rows/s), stopped: { stats['stopped'] }"
+    )
+
+
+if __name__ == "__main__":
+    main()
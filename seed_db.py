@@ -0,0 +1,92 @@
+import argparse
+import random
+import time
+from typing import Any, Dict, List
+
+from api_app import bcrypt, create_app, db
+from api_app.models import Item, User
+
+app = create_app()
+
+DISTRIBUTIONS = ("fixed", "uniform", "pareto")
+ITEM_WORDS = ("sword", "shield", "potion", "scroll", "helmet", "ring", "amulet", "bow", "arrow", "gem")
+
+
+def items_per_user(rng: random.Random, distribution: str, mean: int) -> int:
+    if distribution == "fixed":
+        return mean
+    if distribution == "uniform":
+        return rng.randint(0, 2 * mean)
+    if distribution == "pareto":
+        # Pareto(2) - 1 has mean 1: a few heavy users, a long tail of light ones.
+        return min(round(mean * (rng.paretovariate(2) - 1)), 100 * mean)
+    raise ValueError(f"Unknown distribution: { distribution }")
+
+
+def seed(
+    users: int,
+    items: int,
+    distribution: str = "fixed",
+    seed_value: int = 0,
+    batch_size: int = 1000,
+    password: str = "password",
+) -> Dict[str, Any]:
+    rng = random.Random(seed_value)
+    # One bcrypt hash shared by every seeded user instead of one per row.
+    password_hash = bcrypt.generate_password_hash(password).decode()
+    users_table, items_table = User.__table__, Item.__table__
+    stats = {"users": 0, "items": 0, "seconds": 0.0}
+    started = time.perf_counter()
+    for first in range(0, users, batch_size):
+        usernames = [f"seed_{ seed_value }_{ number }" for number in range(first, min(first + batch_size, users))]
+        db.session.execute(
+            users_table.insert(), [{"username": username, "password": password_hash} for username in usernames]
+        )
+        user_ids = dict(
+            db.session.execute(
+                db.select(users_table.c.username, users_table.c.id).where(users_table.c.username.in_(usernames))
+            ).fetchall()
+        )
+        item_rows: List[Dict[str, Any]] = []
+        for username in usernames:
+            for number in range(items_per_user(rng, distribution, items)):
+                item_rows.append({"name": f"{ rng.choice(ITEM_WORDS) } { number }", "user_id": user_ids[username]})
+                if len(item_rows) >= batch_size:
+                    db.session.execute(items_table.insert(), item_rows)
+                    stats["items"] += len(item_rows)
+                    item_rows = []
+        if item_rows:
+            db.session.execute(items_table.insert(), item_rows)
+            stats["items"] += len(item_rows)
+        db.session.commit()
+        stats["users"] += len(usernames)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{ stats['users'] } users, { stats['items'] } items, "
+            f"{(stats['users'] + stats['items']) / elapsed:.0f} rows/s"
+        )
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fill the database with generated users and items.")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=100, help="mean number of items per user")
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--password", default="password")
+    args = parser.parse_args()
+    with app.app_context():
+        db.create_all()
+        stats = seed(args.users, args.items, args.distribution, args.seed, args.batch_size, args.password)
+    rows = stats["users"] + stats["items"]
+    print(
+        f"Inserted { stats['users'] } users and { stats['items'] } items in {stats['seconds']:.2f}s "
+        f"({rows / stats['seconds']:.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
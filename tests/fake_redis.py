@@ -0,0 +1,44 @@
+import threading
+import time
+
+
+class FakeRedis:
+    """Just enough of the redis-py client API for the shared backends."""
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.lock = threading.Lock()
+
+    def _expire(self, name):
+        if name in self.expires and self.expires[name] <= time.monotonic():
+            self.data.pop(name, None)
+            self.expires.pop(name, None)
+
+    def get(self, name):
+        with self.lock:
+            self._expire(name)
+            return self.data.get(name)
+
+    def set(self, name, value, ex=None, px=None, nx=False):
+        with self.lock:
+            self._expire(name)
+            if nx and name in self.data:
+                return None
+            if isinstance(value, str):
+                value = value.encode()
+            self.data[name] = value
+            self.expires.pop(name, None)
+            if ex is not None:
+                self.expires[name] = time.monotonic() + ex
+            if px is not None:
+                self.expires[name] = time.monotonic() + px / 1000
+            return True
+
+    def delete(self, *names):
+        with self.lock:
+            removed = 0
+            for name in names:
+                removed += self.data.pop(name, None) is not None
+                self.expires.pop(name, None)
+            return removed
@@ -0,0 +1,200 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from api_app import create_app, db
+from flask import json
+
+app = create_app()
+
+
+def create_auth_token(username):
+    auth_token = jwt.encode(
+        {
+            "exp": datetime.utcnow()
+            + timedelta(seconds=app.config["AUTH_TOKEN_PERIOD_EXPIRE_SECONDS"]),
+            "username": username,
+        },
+        app.config["SECRET_KEY"],
+    )
+    return auth_token
+
+
+def post_batch(batch_json, username="batch_user"):
+    return app.test_client().post(
+        "api/v1/batch",
+        data=json.dumps(batch_json),
+        content_type="application/json",
+        headers={"x-access-tokens": create_auth_token(username)},
+    )
+
+
+def get_items(username="batch_user"):
+    response = app.test_client().get(
+        "api/v1/items", headers={"x-access-tokens": create_auth_token(username)}
+    )
+    return response.get_json()["items"]
+
+
+@pytest.fixture(scope="class")
+def configure_app():
+    db_fb, db_path = tempfile.mkstemp()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    app.config["SECRET_KEY"] = "TestKey"
+    app.config["BATCH_MAX_OPERATIONS"] = 3
+    yield
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+@pytest.fixture(scope="class")
+def create_db():
+    with app.app_context():
+        db.create_all()
+    for username in ("batch_user", "d_batch_user"):
+        app.test_client().post(
+            "api/v1/user/registration",
+            data=json.dumps({"username": username, "password": "123123"}),
+            content_type="application/json",
+        )
+
+
+@pytest.mark.usefixtures("configure_app", "create_db")
+class TestBatch:
+    def test_batch(self):
+        assert get_items() == []
+        response = post_batch(
+            {
+                "operations": [
+                    {"method": "POST", "path": "/api/v1/items/new", "body": {"name": "Batch item 1"}},
+                    {"method": "POST", "path": "/api/v1/items/new?fields=id", "body": {"name": "Batch item 2"}},
+                    {"method": "DELETE", "path": "/api/v1/items/1"},
+                ]
+            }
+        )
+        assert response.status_code == 200
+        assert response.get_json() == {
+            "committed": True,
+            "results": [
+                {"status": 200, "body": {"item": {"id": 1, "name": "Batch item 1", "user_id": 1}}},
+                {"status": 200, "body": {"item": {"id": 2}}},
+                {"status": 200, "body": {"item": "Item: Batch item 1 deleted"}},
+            ],
+        }
+        assert get_items() == [{"id": 2, "name": "Batch item 2", "user_id": 1}]
+
+    def test_errors_without_stop(self):
+        response = post_batch(
+            {
+                "operations": [
+                    {"method": "POST", "path": "/api/v1/items/new", "body": {"name": ""}},
+                    {"method": "GET", "path": "/api/v1/unknown"},
+                    {"method": "POST", "path": "/api/v1/items/new", "body": {"name": "Batch item 3"}},
+                ]
+            }
+        )
+        assert response.get_json() == {
+            "committed": True,
+            "results": [
+                {"status": 422, "body": {"message": "{'name': ['Shorter than minimum length 5.']}"}},
+                {"status": 404, "body": {"message": "URL not Found"}},
+                {"status": 200, "body": {"item": {"id": 3, "name": "Batch item 3", "user_id": 1}}},
+            ],
+        }
+
+    def test_stop_on_error_rolls_back(self):
+        response = post_batch(
+            {
+                "stop_on_error": True,
+                "operations": [
+                    {"method": "POST", "path": "/api/v1/items/new", "body": {"name": "Rolled back"}},
+                    {"method": "DELETE", "path": "/api/v1/items/100"},
+                    {"method": "DELETE", "path": "/api/v1/items/2"},
+                ],
+            }
+        )
+        assert response.get_json() == {
+            "committed": False,
+            "results": [
+                {"status": 200, "body": {"item": {"id": 4, "name": "Rolled back", "user_id": 1}}},
+                {"status": 422, "body": {"message": "No item with such id"}},
+                {"status": 424, "body": {"message": "Skipped after a failed operation"}},
+            ],
+        }
+        assert [item["id"] for item in get_items()] == [2, 3]
+
+    def test_rolled_back_reads_not_cached(self):
+        response = post_batch(
+            {
+                "stop_on_error": True,
+                "operations": [
+                    {"method": "POST", "path": "/api/v1/items/new?fields=id", "body": {"name": "Rolled back"}},
+                    {"method": "GET", "path": "/api/v1/items?fields=id"},
+                    {"method": "DELETE", "path": "/api/v1/items/100"},
+                ],
+            }
+        )
+        assert response.get_json()["results"][1] == {
+            "status": 200,
+            "body": {"items": [{"id": 2}, {"id": 3}, {"id": 4}]},
+        }
+        response = app.test_client().get(
+            "api/v1/items?fields=id", headers={"x-access-tokens": create_auth_token("batch_user")}
+        )
+        assert response.get_json() == {"items": [{"id": 2}, {"id": 3}]}
+
+    def test_transfer_in_batch(self):
+        response = post_batch(
+            {
+                "operations": [
+                    {"method": "POST", "path": "/api/v1/send", "body": {"new_username": "d_batch_user", "item_id": 2}}
+                ]
+            }
+        )
+        move_url = response.get_json()["results"][0]["body"]["move_url"]
+        response = post_batch({"operations": [{"method": "GET", "path": move_url}]}, "d_batch_user")
+        assert response.get_json()["results"] == [
+            {"status": 200, "body": {"user": {"id": 2, "name": "Batch item 2", "user_id": 2}}}
+        ]
+        assert [item["id"] for item in get_items()] == [3]
+        assert [item["id"] for item in get_items("d_batch_user")] == [2]
+
+    @pytest.mark.parametrize(
+        "batch_json, expected_data",
+        [
+            (
+                {"operations": [{"method": "GET", "path": "/api/v1/items"}] * 4},
+                {"message": "Batch is limited to 3 operations"},
+            ),
+            (
+                {"operations": []},
+                {"message": "{'operations': ['Shorter than minimum length 1.']}"},
+            ),
+            (
+                {"operations": [{"method": "PUT", "path": "/api/v1/items"}]},
+                {"message": "{'operations': {0: {'method': ['Must be one of: GET, POST, DELETE.']}}}"},
+            ),
+        ],
+    )
+    def test_invalid_batch(self, batch_json, expected_data):
+        response = post_batch(batch_json)
+        assert response.get_json() == expected_data
+        assert response.status_code == 422
+
+    def test_excluded_endpoint(self):
+        response = post_batch({"operations": [{"method": "GET", "path": "/api/v1/items/export"}]})
+        assert response.get_json()["results"] == [
+            {"status": 422, "body": {"message": "Operation is not allowed in a batch"}}
+        ]
+
+    def test_token_required(self):
+        response = app.test_client().post(
+            "api/v1/batch",
+            data=json.dumps({"operations": [{"method": "GET", "path": "/api/v1/items"}]}),
+            content_type="application/json",
+        )
+        assert response.get_json() == {"message": "Token is missing"}
+        assert response.status_code == 403
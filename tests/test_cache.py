@@ -0,0 +1,198 @@
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from api_app import cache, create_app, db
+from api_app.cache import MemoryBackend, RedisBackend, ResponseCache
+from flask import json
+
+from .fake_redis import FakeRedis
+
+app = create_app()
+
+
+def create_auth_token(username):
+    auth_token = jwt.encode(
+        {
+            "exp": datetime.utcnow()
+            + timedelta(seconds=app.config["AUTH_TOKEN_PERIOD_EXPIRE_SECONDS"]),
+            "username": username,
+        },
+        app.config["SECRET_KEY"],
+    )
+    return auth_token
+
+
+def test_disabled_by_default_with_memory_backend():
+    default_app = create_app()
+    with default_app.app_context():
+        assert cache.get_or_build(1, lambda: b"first") == b"first"
+        assert cache.get_or_build(1, lambda: b"second") == b"second"
+
+
+def test_generation_not_kept_by_backend():
+    backend = MemoryBackend(max_bytes=10)
+    first = ResponseCache._generation(backend, 1)
+    assert len(first) == 32
+    assert ResponseCache._generation(backend, 1) != first
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(scope="class")
+def configure_app():
+    db_fb, db_path = tempfile.mkstemp()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    app.config["SECRET_KEY"] = "TestKey"
+    app.config["CACHE_ENABLED"] = True
+    yield
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+@pytest.fixture(scope="class")
+def create_db():
+    with app.app_context():
+        db.create_all()
+
+
+@pytest.fixture(scope="class")
+def create_users():
+    for username in ("cache_user", "d_cache_user"):
+        app.test_client().post(
+            "api/v1/user/registration",
+            data=json.dumps({"username": username, "password": "123123"}),
+            content_type="application/json",
+        )
+
+
+@pytest.fixture()
+def shared_backend():
+    memory_backend = app.extensions["response_cache"]
+    app.extensions["response_cache"] = RedisBackend(FakeRedis(), "test:")
+    yield app.extensions["response_cache"]
+    app.extensions["response_cache"] = memory_backend
+
+
+class TestMemoryBackend:
+    def test_lru_eviction(self):
+        backend = MemoryBackend(max_entries=2)
+        backend.set("a", b"1")
+        backend.set("b", b"2")
+        backend.get("a")
+        backend.set("c", b"3")
+        assert backend.get("a") == b"1"
+        assert backend.get("b") is None
+        assert backend.get("c") == b"3"
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        backend = MemoryBackend(clock=clock)
+        backend.set("a", b"1", ttl=10)
+        clock.now = 9
+        assert backend.get("a") == b"1"
+        clock.now = 10
+        assert backend.get("a") is None
+        assert len(backend) == 0
+
+    def test_memory_cap(self):
+        backend = MemoryBackend(max_bytes=15)
+        backend.set("a", b"123456789")
+        backend.set("b", b"123456789")
+        backend.set("c", b"1" * 100)
+        assert backend.get("a") is None
+        assert backend.get("b") == b"123456789"
+        assert backend.get("c") is None
+        assert backend.size == 10
+
+    def test_add(self):
+        clock = FakeClock()
+        backend = MemoryBackend(clock=clock)
+        assert backend.add("lock", b"1", ttl=5)
+        assert not backend.add("lock", b"1", ttl=5)
+        clock.now = 5
+        assert backend.add("lock", b"1", ttl=5)
+
+
+class TestRedisBackend:
+    def test_prefixed_operations(self):
+        client = FakeRedis()
+        backend = RedisBackend(client, "test:")
+        backend.set("a", b"1", ttl=10)
+        assert client.get("test:a") == b"1"
+        assert backend.get("a") == b"1"
+        assert not backend.add("a", b"2")
+        backend.delete("a")
+        assert backend.get("a") is None
+        assert backend.add("a", b"2")
+
+
+@pytest.mark.usefixtures("configure_app", "create_db", "create_users")
+class TestResponseCache:
+    def test_single_rebuild_under_stampede(self, shared_backend):
+        calls = []
+
+        def build():
+            calls.append(1)
+            time.sleep(0.05)
+            return b"body"
+
+        def request_items(results):
+            with app.app_context():
+                results.append(cache.get_or_build(1, build))
+
+        results = []
+        threads = [threading.Thread(target=request_items, args=(results,)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [b"body"] * 5
+        assert len(calls) == 1
+
+    def test_invalidate(self, shared_backend):
+        with app.app_context():
+            assert cache.get_or_build(1, lambda: b"old") == b"old"
+            assert cache.get_or_build(1, lambda: b"new") == b"old"
+            cache.invalidate(1)
+            assert cache.get_or_build(1, lambda: b"new") == b"new"
+
+    def test_write_paths_invalidate(self):
+        client = app.test_client()
+        headers = {"x-access-tokens": create_auth_token("cache_user")}
+        destination_headers = {"x-access-tokens": create_auth_token("d_cache_user")}
+        assert client.get("api/v1/items", headers=headers).get_json() == {"items": []}
+        client.post(
+            "api/v1/items/new",
+            data=json.dumps({"name": "Cached item"}),
+            content_type="application/json",
+            headers=headers,
+        )
+        assert client.get("api/v1/items", headers=headers).get_json() == {
+            "items": [{"id": 1, "name": "Cached item", "user_id": 1}]
+        }
+        assert client.get("api/v1/items", headers=destination_headers).get_json() == {"items": []}
+        move_url = client.post(
+            "api/v1/send",
+            data=json.dumps({"new_username": "d_cache_user", "item_id": 1}),
+            content_type="application/json",
+            headers=headers,
+        ).get_json()["move_url"]
+        client.get(move_url, headers=destination_headers)
+        assert client.get("api/v1/items", headers=headers).get_json() == {"items": []}
+        assert client.get("api/v1/items", headers=destination_headers).get_json() == {
+            "items": [{"id": 1, "name": "Cached item", "user_id": 2}]
+        }
+        client.delete("api/v1/items/1", headers=destination_headers)
+        assert client.get("api/v1/items", headers=destination_headers).get_json() == {"items": []}
@@ -0,0 +1,196 @@
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from api_app import create_app, db
+from api_app.cache import RedisBackend
+from api_app.events import MemoryBroker, SharedBroker
+from flask import json
+
+from .fake_redis import FakeRedis
+
+app = create_app()
+
+
+def create_auth_token(username):
+    auth_token = jwt.encode(
+        {
+            "exp": datetime.utcnow()
+            + timedelta(seconds=app.config["AUTH_TOKEN_PERIOD_EXPIRE_SECONDS"]),
+            "username": username,
+        },
+        app.config["SECRET_KEY"],
+    )
+    return auth_token
+
+
+def post(url, data, username):
+    return app.test_client().post(
+        url,
+        data=json.dumps(data),
+        content_type="application/json",
+        headers={"x-access-tokens": create_auth_token(username)},
+    )
+
+
+def get_events(username, headers=None, query=""):
+    return app.test_client().get(
+        f"api/v1/events{ query }", headers={"x-access-tokens": create_auth_token(username), **(headers or {})}
+    )
+
+
+@pytest.fixture(scope="class")
+def configure_app():
+    db_fb, db_path = tempfile.mkstemp()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    app.config["SECRET_KEY"] = "TestKey"
+    app.config["RATELIMIT_ENABLED"] = False
+    app.config["EVENTS_POLL_TIMEOUT_SECONDS"] = 0.05
+    app.config["EVENTS_STREAM_SECONDS"] = 0.2
+    app.config["EVENTS_HEARTBEAT_SECONDS"] = 0.05
+    yield
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+@pytest.fixture(scope="class")
+def create_db():
+    with app.app_context():
+        db.create_all()
+    for username in ("events_sender", "events_recipient"):
+        app.test_client().post(
+            "api/v1/user/registration",
+            data=json.dumps({"username": username, "password": "123123"}),
+            content_type="application/json",
+        )
+    post("api/v1/items/new", {"name": "Events item"}, "events_sender")
+
+
+@pytest.fixture(params=["memory", "shared"])
+def broker(request):
+    if request.param == "memory":
+        return MemoryBroker(max_events=3)
+    return SharedBroker(RedisBackend(FakeRedis(), "test:"), max_events=3, poll_interval=0.01)
+
+
+class TestBrokers:
+    def test_fetch_after_id(self, broker):
+        assert broker.fetch(1, 0) == []
+        assert broker.publish(1, {"type": "a"}) == 1
+        assert broker.publish(1, {"type": "b"}) == 2
+        broker.publish(2, {"type": "other"})
+        assert broker.fetch(1, 0) == [{"id": 1, "type": "a"}, {"id": 2, "type": "b"}]
+        assert broker.fetch(1, 1) == [{"id": 2, "type": "b"}]
+        assert broker.fetch(1, 2) == []
+
+    def test_bounded_stream(self, broker):
+        for number in range(5):
+            broker.publish(1, {"type": str(number)})
+        assert [event["id"] for event in broker.fetch(1, 0)] == [3, 4, 5]
+
+    def test_unknown_id_restarts(self, broker):
+        broker.publish(1, {"type": "a"})
+        assert broker.fetch(1, 10) == [{"id": 1, "type": "a"}]
+
+    def test_wait_timeout(self, broker):
+        started = time.monotonic()
+        assert broker.wait(1, 0, 0.05) == []
+        assert time.monotonic() - started >= 0.05
+
+    def test_wait_wakes_on_publish(self, broker):
+        timer = threading.Timer(0.05, broker.publish, (1, {"type": "a"}))
+        timer.start()
+        assert broker.wait(1, 0, 5) == [{"id": 1, "type": "a"}]
+        timer.join()
+
+
+@pytest.mark.usefixtures("configure_app", "create_db")
+class TestEvents:
+    def test_transfer_events(self):
+        response = get_events("events_recipient")
+        assert response.status_code == 200
+        assert response.get_json() == {"events": [], "last_id": 0}
+        response = post("api/v1/send", {"new_username": "events_recipient", "item_id": 1}, "events_sender")
+        move_url = response.get_json()["move_url"]
+        response = get_events("events_recipient")
+        assert response.get_json() == {
+            "events": [
+                {
+                    "id": 1,
+                    "type": "transfer_offered",
+                    "data": {"item_id": 1, "from": "events_sender", "move_url": move_url},
+                }
+            ],
+            "last_id": 1,
+        }
+        assert get_events("events_recipient", query="?after=1").get_json() == {"events": [], "last_id": 1}
+        app.test_client().get(move_url, headers={"x-access-tokens": create_auth_token("events_recipient")})
+        assert get_events("events_sender").get_json()["events"] == [
+            {"id": 1, "type": "transfer_completed", "data": {"item_id": 1, "to": "events_recipient"}}
+        ]
+
+    def test_event_stream(self):
+        response = get_events("events_recipient", {"Accept": "text/event-stream"})
+        assert response.mimetype == "text/event-stream"
+        assert response.headers["Cache-Control"] == "no-cache"
+        body = response.get_data(as_text=True)
+        assert body.startswith("retry: 3000\n\nid: 1\nevent: transfer_offered\ndata: {")
+        assert ": keepalive\n\n" in body
+        response = get_events("events_recipient", {"Accept": "text/event-stream", "Last-Event-ID": "1"})
+        assert "event:" not in response.get_data(as_text=True)
+
+    def test_without_waiting(self):
+        app.config["EVENTS_WAIT_ENABLED"] = False
+        app.config["EVENTS_POLL_TIMEOUT_SECONDS"] = 5
+        started = time.monotonic()
+        try:
+            response = get_events("events_recipient")
+            stream = get_events("events_recipient", {"Accept": "text/event-stream"}).get_data(as_text=True)
+        finally:
+            app.config["EVENTS_WAIT_ENABLED"] = True
+            app.config["EVENTS_POLL_TIMEOUT_SECONDS"] = 0.05
+        assert time.monotonic() - started < 1
+        assert response.get_json()["last_id"] == 1
+        assert stream.startswith("retry: 3000\n\nid: 1\nevent: transfer_offered\ndata: {")
+        assert ": keepalive" not in stream
+
+    def test_batch_publishes_after_commit(self):
+        post(
+            "api/v1/batch",
+            {
+                "stop_on_error": True,
+                "operations": [
+                    {"method": "POST", "path": "/api/v1/send", "body": {"new_username": "events_sender", "item_id": 1}},
+                    {"method": "DELETE", "path": "/api/v1/items/100"},
+                ],
+            },
+            "events_recipient",
+        )
+        assert get_events("events_sender", query="?after=1").get_json()["events"] == []
+        post(
+            "api/v1/batch",
+            {
+                "operations": [
+                    {"method": "POST", "path": "/api/v1/send", "body": {"new_username": "events_sender", "item_id": 1}}
+                ]
+            },
+            "events_recipient",
+        )
+        assert [event["type"] for event in get_events("events_sender", query="?after=1").get_json()["events"]] == [
+            "transfer_offered"
+        ]
+
+    def test_invalid_event_id(self):
+        response = get_events("events_recipient", query="?after=last")
+        assert response.get_json() == {"message": "Event id must be an integer"}
+        assert response.status_code == 422
+
+    def test_token_required(self):
+        response = app.test_client().get("api/v1/events")
+        assert response.get_json() == {"message": "Token is missing"}
+        assert response.status_code == 403
@@ -0,0 +1,186 @@
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from api_app import create_app, db
+from api_app.models import IdempotencyKey, Item
+from flask import json
+
+app = create_app()
+
+
+def create_auth_token(username):
+    auth_token = jwt.encode(
+        {
+            "exp": datetime.utcnow()
+            + timedelta(seconds=app.config["AUTH_TOKEN_PERIOD_EXPIRE_SECONDS"]),
+            "username": username,
+        },
+        app.config["SECRET_KEY"],
+    )
+    return auth_token
+
+
+def post(url, data, key=None, username="idempotent_user"):
+    headers = {"x-access-tokens": create_auth_token(username)}
+    if key is not None:
+        headers["Idempotency-Key"] = key
+    return app.test_client().post(url, data=json.dumps(data), content_type="application/json", headers=headers)
+
+
+def count_items():
+    with app.app_context():
+        return Item.query.count()
+
+
+def stored_key(key):
+    with app.app_context():
+        return IdempotencyKey.query.filter_by(key=key).first()
+
+
+@pytest.fixture(scope="class")
+def configure_app():
+    db_fb, db_path = tempfile.mkstemp()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    app.config["SECRET_KEY"] = "TestKey"
+    app.config["RATELIMIT_ENABLED"] = False
+    app.config["IDEMPOTENCY_WAIT_SECONDS"] = 0.2
+    app.config["IDEMPOTENCY_POLL_SECONDS"] = 0.01
+    yield
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+@pytest.fixture(scope="class")
+def create_db():
+    with app.app_context():
+        db.create_all()
+    for username in ("idempotent_user", "d_idempotent_user"):
+        app.test_client().post(
+            "api/v1/user/registration",
+            data=json.dumps({"username": username, "password": "123123"}),
+            content_type="application/json",
+        )
+
+
+@pytest.mark.usefixtures("configure_app", "create_db")
+class TestIdempotency:
+    def test_replay(self):
+        response = post("api/v1/items/new", {"name": "Idempotent item"}, "create-1")
+        assert response.status_code == 200
+        assert "Idempotent-Replayed" not in response.headers
+        replayed = post("api/v1/items/new", {"name": "Idempotent item"}, "create-1")
+        assert replayed.status_code == 200
+        assert replayed.headers["Idempotent-Replayed"] == "true"
+        assert replayed.get_json() == response.get_json() == {
+            "item": {"id": 1, "name": "Idempotent item", "user_id": 1}
+        }
+        assert count_items() == 1
+
+    def test_without_key(self):
+        post("api/v1/items/new", {"name": "Plain item"})
+        post("api/v1/items/new", {"name": "Plain item"})
+        assert count_items() == 3
+
+    def test_keys_are_per_user(self):
+        response = post("api/v1/items/new", {"name": "Idempotent item"}, "create-1", "d_idempotent_user")
+        assert response.get_json() == {"item": {"id": 4, "name": "Idempotent item", "user_id": 2}}
+        assert "Idempotent-Replayed" not in response.headers
+
+    def test_send_replay(self):
+        send_json = {"new_username": "d_idempotent_user", "item_id": 1}
+        response = post("api/v1/send", send_json, "send-1")
+        replayed = post("api/v1/send", send_json, "send-1")
+        assert replayed.headers["Idempotent-Replayed"] == "true"
+        assert replayed.get_json() == response.get_json()
+
+    def test_client_errors_are_replayed(self):
+        response = post("api/v1/items/new", {"name": ""}, "invalid-1")
+        assert response.status_code == 422
+        replayed = post("api/v1/items/new", {"name": ""}, "invalid-1")
+        assert replayed.status_code == 422
+        assert replayed.headers["Idempotent-Replayed"] == "true"
+
+    def test_key_reused_for_another_request(self):
+        response = post("api/v1/items/new", {"name": "Another item"}, "create-1")
+        assert response.get_json() == {"message": "Idempotency-Key was already used for another request"}
+        assert response.status_code == 422
+
+    def test_server_error_releases_key(self, monkeypatch):
+        def fail(self):
+            raise RuntimeError("Database is gone")
+
+        monkeypatch.setattr(Item, "create", fail)
+        with pytest.raises(RuntimeError):
+            post("api/v1/items/new", {"name": "Failed item"}, "failed-1")
+        assert stored_key("failed-1") is None
+        monkeypatch.undo()
+        response = post("api/v1/items/new", {"name": "Failed item"}, "failed-1")
+        assert response.status_code == 200
+        assert "Idempotent-Replayed" not in response.headers
+
+    def test_concurrent_duplicate_waits(self):
+        with app.app_context():
+            db.session.add(
+                IdempotencyKey(
+                    user_id=1,
+                    key="pending-1",
+                    request_hash=stored_key("create-1").request_hash,
+                    expires_at=datetime.utcnow() + timedelta(days=1),
+                    locked_until=datetime.utcnow() + timedelta(minutes=1),
+                )
+            )
+            db.session.commit()
+        response = post("api/v1/items/new", {"name": "Idempotent item"}, "pending-1")
+        assert response.get_json() == {"message": "A request with this Idempotency-Key is still in progress"}
+        assert response.status_code == 409
+
+        def complete():
+            with app.app_context():
+                IdempotencyKey.query.filter_by(key="pending-1").update(
+                    {"status_code": 200, "response": '{"item": "finished elsewhere"}'}
+                )
+                db.session.commit()
+
+        timer = threading.Timer(0.05, complete)
+        timer.start()
+        response = post("api/v1/items/new", {"name": "Idempotent item"}, "pending-1")
+        timer.join()
+        assert response.get_json() == {"item": "finished elsewhere"}
+        assert response.headers["Idempotent-Replayed"] == "true"
+
+    def test_expired_lease_is_taken_over(self):
+        with app.app_context():
+            db.session.add(
+                IdempotencyKey(
+                    user_id=1,
+                    key="abandoned-1",
+                    request_hash=stored_key("create-1").request_hash,
+                    expires_at=datetime.utcnow() + timedelta(days=1),
+                    locked_until=datetime.utcnow() - timedelta(seconds=1),
+                )
+            )
+            db.session.commit()
+        items = count_items()
+        response = post("api/v1/items/new", {"name": "Idempotent item"}, "abandoned-1")
+        assert response.status_code == 200
+        assert "Idempotent-Replayed" not in response.headers
+        assert count_items() == items + 1
+        replayed = post("api/v1/items/new", {"name": "Idempotent item"}, "abandoned-1")
+        assert replayed.headers["Idempotent-Replayed"] == "true"
+        assert replayed.get_json() == response.get_json()
+
+    def test_expired_key_runs_again(self):
+        with app.app_context():
+            IdempotencyKey.query.filter_by(key="create-1", user_id=1).update(
+                {"expires_at": datetime.utcnow() - timedelta(seconds=1)}
+            )
+            db.session.commit()
+        items = count_items()
+        response = post("api/v1/items/new", {"name": "Idempotent item"}, "create-1")
+        assert "Idempotent-Replayed" not in response.headers
+        assert count_items() == items + 1
@@ -259,14 +259,14 @@ class TestItem:
                 "x-access-tokens",
                 "auth_token",
                 200,
-                {"new_username": "d_test_user", "item_id": 1},
+                {"new_username": "d_test_user", "item_id": 1, "from_user_id": 1},
             ),
             (
                 json.dumps({"new_username": "fake_url_test_user", "item_id": 2}),
                 "x-access-tokens",
                 "destination_auth_token",
                 200,
-                {"new_username": "fake_url_test_user", "item_id": 2},
+                {"new_username": "fake_url_test_user", "item_id": 2, "from_user_id": 2},
             ),
             (
                 json.dumps({"new_username": "test_user", "item_id": 1}),
@@ -0,0 +1,144 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from api_app import create_app, db
+from flask import json
+
+app = create_app()
+
+
+def create_auth_token(username):
+    auth_token = jwt.encode(
+        {
+            "exp": datetime.utcnow()
+            + timedelta(seconds=app.config["AUTH_TOKEN_PERIOD_EXPIRE_SECONDS"]),
+            "username": username,
+        },
+        app.config["SECRET_KEY"],
+    )
+    return auth_token
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+@pytest.fixture(scope="class")
+def configure_app():
+    db_fb, db_path = tempfile.mkstemp()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    app.config["SECRET_KEY"] = "TestKey"
+    app.config["IMPORT_CHUNK_SIZE"] = 2
+    yield
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+@pytest.fixture(scope="class")
+def create_db():
+    with app.app_context():
+        db.create_all()
+
+
+@pytest.fixture(scope="class")
+def create_users():
+    for username in ("export_user", "import_user"):
+        app.test_client().post(
+            "api/v1/user/registration",
+            data=json.dumps({"username": username, "password": "123123"}),
+            content_type="application/json",
+        )
+
+
+@pytest.mark.usefixtures("configure_app", "create_db", "create_users")
+class TestExportImport:
+    def test_import_items(self):
+        lines = [
+            json.dumps({"name": "First item"}),
+            json.dumps({"id": 10, "name": "Second item", "user_id": 2}),
+            "",
+            json.dumps({"name": ""}),
+            "{not json",
+            json.dumps({"name": "Third item"}),
+        ]
+        client = app.test_client()
+        response = client.post(
+            "api/v1/items/import",
+            data="\n".join(lines) + "\n",
+            content_type="application/x-ndjson",
+            headers={"x-access-tokens": create_auth_token("export_user")},
+        )
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        assert read_ndjson(response) == [
+            {"progress": {"lines": 2, "imported": 2, "failed": 0}},
+            {"error": {"line": 4, "message": "{'name': ['Shorter than minimum length 5.']}"}},
+            {"error": {"line": 5, "message": "Invalid JSON"}},
+            {"result": {"lines": 6, "imported": 3, "failed": 2}},
+        ]
+
+    def test_export_items(self):
+        client = app.test_client()
+        response = client.get(
+            "api/v1/items/export",
+            headers={"x-access-tokens": create_auth_token("export_user")},
+        )
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        assert read_ndjson(response) == [
+            {"id": 1, "name": "First item", "user_id": 1},
+            {"id": 2, "name": "Second item", "user_id": 1},
+            {"id": 3, "name": "Third item", "user_id": 1},
+        ]
+
+    def test_export_round_trip(self):
+        client = app.test_client()
+        exported = client.get(
+            "api/v1/items/export",
+            headers={"x-access-tokens": create_auth_token("export_user")},
+        )
+        response = client.post(
+            "api/v1/items/import",
+            data=exported.get_data(),
+            content_type="application/x-ndjson",
+            headers={"x-access-tokens": create_auth_token("import_user")},
+        )
+        assert read_ndjson(response)[-1] == {"result": {"lines": 3, "imported": 3, "failed": 0}}
+        items = client.get(
+            "api/v1/items",
+            headers={"x-access-tokens": create_auth_token("import_user")},
+        )
+        assert items.get_json() == {
+            "items": [
+                {"id": 4, "name": "First item", "user_id": 2},
+                {"id": 5, "name": "Second item", "user_id": 2},
+                {"id": 6, "name": "Third item", "user_id": 2},
+            ]
+        }
+
+    def test_export_token_missing(self):
+        client = app.test_client()
+        response = client.get("api/v1/items/export")
+        assert response.get_json() == {"message": "Token is missing"}
+        assert response.status_code == 403
+
+    def test_import_long_lines(self):
+        app.config["IMPORT_MAX_LINE_BYTES"] = 30
+        try:
+            response = app.test_client().post(
+                "api/v1/items/import",
+                data=json.dumps({"name": "x" * 100}) + "\n" + json.dumps({"name": "Short"}) + "\n" + "y" * 100,
+                content_type="application/x-ndjson",
+                headers={"x-access-tokens": create_auth_token("import_user")},
+            )
+        finally:
+            app.config["IMPORT_MAX_LINE_BYTES"] = 64 * 1024
+        assert read_ndjson(response) == [
+            {"error": {"line": 1, "message": "Line is too long"}},
+            {"error": {"line": 3, "message": "Line is too long"}},
+            {"result": {"lines": 3, "imported": 1, "failed": 2}},
+        ]
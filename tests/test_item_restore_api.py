@@ -0,0 +1,110 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from api_app import create_app, db
+from api_app.models import Item
+from flask import json
+
+app = create_app()
+
+
+def create_auth_token(username):
+    auth_token = jwt.encode(
+        {
+            "exp": datetime.utcnow()
+            + timedelta(seconds=app.config["AUTH_TOKEN_PERIOD_EXPIRE_SECONDS"]),
+            "username": username,
+        },
+        app.config["SECRET_KEY"],
+    )
+    return auth_token
+
+
+def request(method, url, data=None, username="restore_user"):
+    return app.test_client().open(
+        url,
+        method=method,
+        data=json.dumps(data) if data is not None else None,
+        content_type="application/json",
+        headers={"x-access-tokens": create_auth_token(username)},
+    )
+
+
+@pytest.fixture(scope="class")
+def configure_app():
+    db_fb, db_path = tempfile.mkstemp()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    app.config["SECRET_KEY"] = "TestKey"
+    app.config["RATELIMIT_ENABLED"] = False
+    yield
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+@pytest.fixture(scope="class")
+def create_db():
+    with app.app_context():
+        db.create_all()
+    for username in ("restore_user", "d_restore_user"):
+        app.test_client().post(
+            "api/v1/user/registration",
+            data=json.dumps({"username": username, "password": "123123"}),
+            content_type="application/json",
+        )
+    for name in ("Restore item 1", "Restore item 2"):
+        request("POST", "api/v1/items/new", {"name": name})
+
+
+@pytest.mark.usefixtures("configure_app", "create_db")
+class TestTombstone:
+    def test_delete_hides_item(self):
+        response = request("DELETE", "api/v1/items/1")
+        assert response.get_json() == {"item": "Item: Restore item 1 deleted"}
+        with app.app_context():
+            assert Item.query.get(1).deleted_at is not None
+        assert request("GET", "api/v1/items").get_json() == {
+            "items": [{"id": 2, "name": "Restore item 2", "user_id": 1}]
+        }
+        assert request("GET", "api/v1/items?fields=id").get_json() == {"items": [{"id": 2}]}
+        export = request("GET", "api/v1/items/export").get_data(as_text=True)
+        assert [json.loads(line)["id"] for line in export.splitlines()] == [2]
+
+    @pytest.mark.parametrize(
+        "method, url, data, expected_data",
+        [
+            ("DELETE", "api/v1/items/1", None, {"message": "No item with such id"}),
+            (
+                "POST",
+                "api/v1/send",
+                {"new_username": "d_restore_user", "item_id": 1},
+                {"message": "No item with such id"},
+            ),
+        ],
+    )
+    def test_deleted_item_is_gone(self, method, url, data, expected_data):
+        response = request(method, url, data)
+        assert response.get_json() == expected_data
+        assert response.status_code == 422
+
+    def test_restore(self):
+        response = request("POST", "api/v1/items/1/restore", username="d_restore_user")
+        assert response.get_json() == {"message": "No deleted item with such id"}
+        assert response.status_code == 422
+        response = request("POST", "api/v1/items/1/restore")
+        assert response.get_json() == {"item": {"id": 1, "name": "Restore item 1", "user_id": 1}}
+        assert [item["id"] for item in request("GET", "api/v1/items").get_json()["items"]] == [1, 2]
+        response = request("POST", "api/v1/items/1/restore")
+        assert response.status_code == 422
+
+    def test_restore_window(self):
+        request("DELETE", "api/v1/items/2")
+        with app.app_context():
+            Item.query.filter_by(id=2).update({"deleted_at": datetime.utcnow() - timedelta(days=2)})
+            db.session.commit()
+        response = request("POST", "api/v1/items/2/restore")
+        assert response.get_json() == {"message": "No deleted item with such id"}
+        assert response.status_code == 422
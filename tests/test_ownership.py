@@ -0,0 +1,181 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from api_app import create_app, db, ownership, queries
+from api_app.cache import RedisBackend
+from flask import json
+from sqlalchemy import event
+
+from .fake_redis import FakeRedis
+
+app = create_app()
+
+
+def create_auth_token(username):
+    auth_token = jwt.encode(
+        {
+            "exp": datetime.utcnow()
+            + timedelta(seconds=app.config["AUTH_TOKEN_PERIOD_EXPIRE_SECONDS"]),
+            "username": username,
+        },
+        app.config["SECRET_KEY"],
+    )
+    return auth_token
+
+
+def request(method, url, data=None, username="owner_user"):
+    return app.test_client().open(
+        url,
+        method=method,
+        data=json.dumps(data) if data is not None else None,
+        content_type="application/json",
+        headers={"x-access-tokens": create_auth_token(username)},
+    )
+
+
+def indexed_owner(item_id):
+    value = app.extensions["ownership"].get(f"owner:{ item_id }")
+    return int(value) if value is not None else None
+
+
+@pytest.fixture(scope="class")
+def configure_app():
+    db_fb, db_path = tempfile.mkstemp()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    app.config["SECRET_KEY"] = "TestKey"
+    app.config["RATELIMIT_ENABLED"] = False
+    app.config["OWNERSHIP_ENABLED"] = True
+    app.extensions["ownership"] = RedisBackend(FakeRedis(), "test:")
+    yield
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+@pytest.fixture(scope="class")
+def create_db():
+    with app.app_context():
+        db.create_all()
+    for username in ("owner_user", "d_owner_user", "t_owner_user"):
+        app.test_client().post(
+            "api/v1/user/registration",
+            data=json.dumps({"username": username, "password": "123123"}),
+            content_type="application/json",
+        )
+
+
+@pytest.fixture()
+def statements():
+    with app.app_context():
+        engine = db.get_engine(app)
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.mark.usefixtures("configure_app", "create_db")
+class TestOwnership:
+    def test_write_through(self):
+        request("POST", "api/v1/items/new", {"name": "Owned item 1"})
+        assert indexed_owner(1) == 1
+        request("DELETE", "api/v1/items/1")
+        assert indexed_owner(1) is None
+        request("POST", "api/v1/items/1/restore")
+        assert indexed_owner(1) == 1
+
+    def test_transfer_validation_queries(self, statements):
+        response = request("POST", "api/v1/send", {"new_username": "d_owner_user", "item_id": 1})
+        assert response.status_code == 200
+        # The token's user and the destination user, the owner comes from the index.
+        assert len(statements) == 2
+        assert all("FROM users" in statement for statement in statements)
+        move_url = response.get_json()["move_url"]
+        response = request("GET", move_url, username="d_owner_user")
+        assert response.status_code == 200
+        assert indexed_owner(1) == 2
+
+    def test_read_through(self):
+        app.extensions["ownership"].delete("owner:1")
+        response = request("POST", "api/v1/send", {"new_username": "owner_user", "item_id": 1}, "d_owner_user")
+        assert response.status_code == 200
+        assert indexed_owner(1) == 2
+
+    @pytest.mark.parametrize(
+        "send_json, username, expected_status_code, expected_data",
+        [
+            ({"new_username": "unknown_user", "item_id": 1}, "d_owner_user", 422, {"message": "No destination user"}),
+            ({"new_username": "owner_user", "item_id": 100}, "d_owner_user", 422, {"message": "No item with such id"}),
+            ({"new_username": "d_owner_user", "item_id": 1}, "owner_user", 403, {"message": "Item not belong to user"}),
+            (
+                {"new_username": "d_owner_user", "item_id": 1},
+                "d_owner_user",
+                422,
+                {"message": "User already has this item"},
+            ),
+        ],
+    )
+    def test_send_errors(self, send_json, username, expected_status_code, expected_data):
+        response = request("POST", "api/v1/send", send_json, username)
+        assert response.get_json() == expected_data
+        assert response.status_code == expected_status_code
+        assert indexed_owner(100) is None
+
+    def test_rolled_back_batch_writes_nothing(self):
+        request(
+            "POST",
+            "api/v1/batch",
+            {
+                "stop_on_error": True,
+                "operations": [
+                    {"method": "POST", "path": "/api/v1/items/new", "body": {"name": "Owned item 2"}},
+                    {"method": "DELETE", "path": "/api/v1/items/100"},
+                ],
+            },
+        )
+        assert indexed_owner(2) is None
+        request(
+            "POST",
+            "api/v1/batch",
+            {"operations": [{"method": "POST", "path": "/api/v1/items/new", "body": {"name": "Owned item 2"}}]},
+        )
+        assert indexed_owner(2) == 1
+
+    def test_stale_index_does_not_move_item(self):
+        # Another worker's index still says owner_user owns item 1.
+        app.extensions["ownership"].set("owner:1", b"1")
+        response = request("POST", "api/v1/send", {"new_username": "d_owner_user", "item_id": 1})
+        move_url = response.get_json()["move_url"]
+        response = request("GET", move_url, username="d_owner_user")
+        assert response.get_json() == {"message": "User already has this item or reuse url"}
+        assert response.status_code == 422
+
+    def test_stale_move_url_is_outdated(self):
+        # owner_user's stale index lets it offer item 1, now owned by d_owner_user.
+        response = request("POST", "api/v1/send", {"new_username": "t_owner_user", "item_id": 1})
+        move_url = response.get_json()["move_url"]
+        response = request("GET", move_url, username="t_owner_user")
+        assert response.get_json() == {"message": "Move url is outdated"}
+        assert response.status_code == 422
+        with app.app_context():
+            assert queries.item_owner(1) == 2
+
+    def test_verify(self):
+        with app.app_context():
+            stats = ownership.verify(batch_size=1)
+            assert stats == {"checked": 2, "cached": 2, "mismatched": [1]}
+            ownership.verify(repair=True)
+            assert ownership.verify() == {"checked": 2, "cached": 1, "mismatched": []}
+
+    def test_move_url_without_sender(self):
+        move_token = jwt.encode({"item_id": 1, "new_username": "t_owner_user"}, app.config["SECRET_KEY"])
+        response = request("GET", f"api/v1/get/{ move_token }", username="t_owner_user")
+        assert response.status_code == 200
+        assert response.get_json()["user"]["user_id"] == 3
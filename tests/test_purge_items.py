@@ -0,0 +1,74 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+from api_app import db
+from api_app.models import Item, User
+
+from purge_items import app, in_quiet_hours, parse_hours, purge
+
+
+@pytest.fixture()
+def configure_app():
+    db_fb, db_path = tempfile.mkstemp()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username="purge_user", password="123123"))
+        now = datetime.utcnow()
+        for number, deleted_at in enumerate([None] * 2 + [now - timedelta(days=2)] * 5 + [now]):
+            db.session.add(Item(name=f"Purge item { number }", user_id=1, deleted_at=deleted_at))
+        db.session.commit()
+        yield
+        db.session.remove()
+        db.get_engine(app).dispose()
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+@pytest.mark.parametrize(
+    "quiet_hours, hour, expected",
+    [
+        (None, 12, True),
+        ((1, 5), 1, True),
+        ((1, 5), 5, False),
+        ((22, 4), 23, True),
+        ((22, 4), 3, True),
+        ((22, 4), 12, False),
+    ],
+)
+def test_in_quiet_hours(quiet_hours, hour, expected):
+    assert in_quiet_hours(quiet_hours, datetime(2021, 1, 1, hour)) is expected
+
+
+def test_parse_hours():
+    assert parse_hours("22-4") == (22, 4)
+
+
+@pytest.mark.usefixtures("configure_app")
+class TestPurge:
+    def test_purge_in_batches(self):
+        stats = purge(batch_size=2)
+        assert stats["rows"] == 5
+        assert stats["batches"] == 3
+        assert stats["stopped"] == "done"
+        # Live items and tombstones still inside the undelete window stay.
+        assert Item.query.count() == 3
+        assert Item.query.filter(Item.deleted_at.isnot(None)).count() == 1
+
+    def test_undelete_window(self):
+        assert purge(undelete_seconds=7 * 86400)["rows"] == 0
+        assert purge(undelete_seconds=0)["rows"] == 6
+
+    def test_stops_outside_quiet_hours(self):
+        hour = datetime.now().hour
+        stats = purge(quiet_hours=((hour + 1) % 24, (hour + 2) % 24))
+        assert stats["stopped"] == "quiet_hours"
+        assert stats["rows"] == 0
+
+    def test_max_seconds(self):
+        stats = purge(batch_size=1, max_seconds=0)
+        assert stats["stopped"] == "max_seconds"
+        assert stats["rows"] == 0
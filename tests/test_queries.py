@@ -0,0 +1,50 @@
+import os
+import tempfile
+
+import pytest
+from api_app import create_app, db, queries
+from api_app.models import Item, User
+
+app = create_app()
+
+
+@pytest.fixture(scope="class")
+def configure_app():
+    db_fb, db_path = tempfile.mkstemp()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(
+            [User(username="query_user", password="123123"), User(username="other_user", password="123123")]
+        )
+        db.session.commit()
+        db.session.add_all([Item(name="Query item 1", user_id=1), Item(name="Query item 2", user_id=1)])
+        db.session.commit()
+        yield
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+@pytest.mark.usefixtures("configure_app")
+class TestQueries:
+    def test_user_by_username(self):
+        assert queries.user_by_username("query_user").id == 1
+        assert queries.user_by_username("no_user") is None
+        assert queries.user_id_by_username("other_user") == 2
+        assert queries.user_id_by_username("no_user") is None
+
+    def test_items_by_user(self):
+        assert [item.name for item in queries.items_by_user(1)] == ["Query item 1", "Query item 2"]
+        assert queries.items_by_user(2) == []
+
+    @pytest.mark.parametrize("item_id, expected", [(1, 1), (2, 1), (100, None)])
+    def test_item_owner(self, item_id, expected):
+        assert queries.item_owner(item_id) == expected
+
+    def test_statement_cache_hits(self):
+        queries.item_owner(1)
+        queries.statement_cache_stats.reset()
+        for item_id in range(1, 4):
+            queries.item_owner(item_id)
+        assert queries.statement_cache_stats.as_dict() == {"hits": 3, "misses": 0, "hit_rate": 1.0}
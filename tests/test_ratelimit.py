@@ -0,0 +1,179 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from api_app import create_app, db
+from api_app.cache import RedisBackend
+from api_app.ratelimit import MemoryBucketStore, SharedBucketStore, parse_rule
+from flask import json
+
+from .fake_redis import FakeRedis
+
+app = create_app()
+
+
+def create_auth_token(username):
+    auth_token = jwt.encode(
+        {
+            "exp": datetime.utcnow()
+            + timedelta(seconds=app.config["AUTH_TOKEN_PERIOD_EXPIRE_SECONDS"]),
+            "username": username,
+        },
+        app.config["SECRET_KEY"],
+    )
+    return auth_token
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(scope="class")
+def configure_app():
+    db_fb, db_path = tempfile.mkstemp()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    app.config["SECRET_KEY"] = "TestKey"
+    app.config["RATELIMIT_RULES"] = {
+        "api.login_user": "2/minute",
+        "api.create_item": "2/minute",
+        "api.batch": "5/minute",
+    }
+    yield
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+@pytest.fixture(scope="class")
+def create_db():
+    with app.app_context():
+        db.create_all()
+
+
+@pytest.fixture(scope="class")
+def create_users():
+    for username in ("limited_user", "other_limited_user", "batch_limited_user"):
+        app.test_client().post(
+            "api/v1/user/registration",
+            data=json.dumps({"username": username, "password": "123123"}),
+            content_type="application/json",
+        )
+
+
+@pytest.mark.parametrize(
+    "rule, expected",
+    [("10/minute", (10, 10 / 60)), ("5/second", (5, 5.0)), ("30/15", (30, 2.0))],
+)
+def test_parse_rule(rule, expected):
+    assert parse_rule(rule) == expected
+
+
+@pytest.mark.parametrize(
+    "make_store",
+    [
+        lambda clock: MemoryBucketStore(clock=clock),
+        lambda clock: SharedBucketStore(RedisBackend(FakeRedis()), clock=clock),
+    ],
+)
+def test_token_bucket(make_store):
+    clock = FakeClock()
+    store = make_store(clock)
+    assert store.consume("key", 2, 1.0) == (True, 1.0, 1.0)
+    assert store.consume("key", 2, 1.0) == (True, 0.0, 2.0)
+    assert store.consume("key", 2, 1.0)[0] is False
+    assert store.consume("other_key", 2, 1.0)[0] is True
+    clock.now += 0.5
+    assert store.consume("key", 2, 1.0)[0] is False
+    clock.now += 0.5
+    assert store.consume("key", 2, 1.0) == (True, 0.0, 2.0)
+    clock.now += 10
+    assert store.consume("key", 2, 1.0) == (True, 1.0, 1.0)
+
+
+class UnreachableRedis(FakeRedis):
+    def set(self, name, value, ex=None, px=None, nx=False):
+        raise ConnectionError("Connection refused")
+
+
+def test_shared_store_fails_open():
+    store = SharedBucketStore(RedisBackend(UnreachableRedis()))
+    assert store.consume("key", 5, 1) == (True, 5.0, 0.0)
+
+
+def test_memory_store_key_cap():
+    store = MemoryBucketStore(max_keys=2)
+    store.consume("a", 1, 1.0)
+    store.consume("b", 1, 1.0)
+    store.consume("c", 1, 1.0)
+    assert store.consume("a", 1, 1.0)[0] is True
+
+
+@pytest.mark.usefixtures("configure_app", "create_db", "create_users")
+class TestRateLimit:
+    def test_login_limited_by_ip(self):
+        client = app.test_client()
+        credentials = json.dumps({"username": "limited_user", "password": "123123"})
+        responses = [
+            client.post("api/v1/user/login", data=credentials, content_type="application/json")
+            for _ in range(3)
+        ]
+        assert [response.status_code for response in responses] == [200, 200, 429]
+        assert responses[0].headers["RateLimit-Limit"] == "2"
+        assert responses[0].headers["RateLimit-Remaining"] == "1"
+        assert responses[1].headers["RateLimit-Remaining"] == "0"
+        assert responses[2].get_json() == {"message": "Too many requests"}
+        assert responses[2].headers["Retry-After"] == "30"
+        assert responses[2].headers["RateLimit-Reset"] == "60"
+
+    def test_create_item_limited_by_user(self):
+        client = app.test_client()
+
+        def create_item(username):
+            return client.post(
+                "api/v1/items/new",
+                data=json.dumps({"name": "Limited item"}),
+                content_type="application/json",
+                headers={"x-access-tokens": create_auth_token(username)},
+            )
+
+        assert [create_item("limited_user").status_code for _ in range(3)] == [200, 200, 429]
+        assert create_item("other_limited_user").status_code == 200
+
+    def test_unlimited_route_has_no_headers(self):
+        response = app.test_client().get(
+            "api/v1/items", headers={"x-access-tokens": create_auth_token("limited_user")}
+        )
+        assert response.status_code == 200
+        assert "RateLimit-Limit" not in response.headers
+
+    def test_batch_operations_are_limited(self):
+        response = app.test_client().post(
+            "api/v1/batch",
+            data=json.dumps(
+                {
+                    "operations": [
+                        {"method": "POST", "path": "/api/v1/items/new", "body": {"name": "Limited item"}}
+                    ]
+                    * 3
+                    + [
+                        {
+                            "method": "POST",
+                            "path": "/api/v1/user/login",
+                            "body": {"username": "batch_limited_user", "password": "123123"},
+                        }
+                    ]
+                }
+            ),
+            content_type="application/json",
+            headers={"x-access-tokens": create_auth_token("batch_limited_user")},
+        )
+        # The login shares the client's IP bucket, test_login_limited_by_ip used it up.
+        assert [result["status"] for result in response.get_json()["results"]] == [200, 200, 429, 429]
+        assert response.headers["RateLimit-Limit"] == "5"
+        assert response.headers["RateLimit-Remaining"] == "4"
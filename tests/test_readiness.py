@@ -0,0 +1,58 @@
+import os
+import tempfile
+
+import pytest
+from api_app import create_app, db
+from api_app.warmup import process_local_settings, warm_up
+
+app = create_app()
+
+
+@pytest.fixture(scope="class")
+def configure_app():
+    db_fb, db_path = tempfile.mkstemp()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    with app.app_context():
+        db.create_all()
+    yield
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+@pytest.mark.usefixtures("configure_app")
+class TestReadiness:
+    def test_not_ready_before_warm_up(self):
+        response = app.test_client().get("api/v1/ready")
+        assert response.status_code == 503
+        assert response.get_json()["ready"] is False
+
+    def test_ready_after_warm_up(self):
+        state = warm_up(app)
+        assert state["warmed"] is True
+        assert state["connections"] >= 1
+        response = app.test_client().get("api/v1/ready")
+        response_data = response.get_json()
+        assert response.status_code == 200
+        assert response_data["ready"] is True
+        assert response_data["warmup"] == state
+        assert "class" in response_data["pool"]
+        assert set(response_data["statement_cache"]) == {"hits", "misses", "hit_rate"}
+
+
+def test_process_local_settings():
+    config = {
+        "CACHE_BACKEND": "memory",
+        "CACHE_ENABLED": False,
+        "OWNERSHIP_ENABLED": True,
+        "RATELIMIT_ENABLED": True,
+        "RATELIMIT_BACKEND": "memory",
+        "EVENTS_BACKEND": "memory",
+    }
+    assert process_local_settings(config) == [
+        "OWNERSHIP_ENABLED with CACHE_BACKEND=memory",
+        "RATELIMIT_BACKEND=memory",
+        "EVENTS_BACKEND=memory",
+    ]
+    config.update(CACHE_BACKEND="redis", CACHE_ENABLED=True, RATELIMIT_ENABLED=False, EVENTS_BACKEND="redis")
+    assert process_local_settings(config) == []
@@ -0,0 +1,117 @@
+import os
+import tempfile
+
+import jwt
+import pytest
+from api_app import create_app, db
+from api_app.models import RefreshToken
+from flask import json
+
+app = create_app()
+
+
+def post(url, data):
+    return app.test_client().post(url, data=json.dumps(data), content_type="application/json")
+
+
+@pytest.fixture(scope="class")
+def configure_app():
+    db_fb, db_path = tempfile.mkstemp()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    app.config["SECRET_KEY"] = "TestKey"
+    yield
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+@pytest.fixture(scope="class")
+def create_db():
+    with app.app_context():
+        db.create_all()
+
+
+@pytest.fixture(scope="class")
+def login_user(request):
+    post("api/v1/user/registration", {"username": "refresh_user", "password": "123123"})
+    response = post("api/v1/user/login", {"username": "refresh_user", "password": "123123"})
+    request.config.cache.set("refresh_token", response.get_json()["user"]["refresh_token"])
+
+
+@pytest.mark.usefixtures("configure_app", "create_db", "login_user")
+class TestRefreshToken:
+    def test_refresh(self, request):
+        refresh_token = request.config.cache.get("refresh_token", None)
+        response = post("api/v1/user/refresh", {"refresh_token": refresh_token})
+        response_data = response.get_json()
+        assert response.status_code == 200
+        assert response_data["user"]["refresh_token"] != refresh_token
+        decode_auth_token = jwt.decode(
+            response_data["user"]["auth_token"], app.config["SECRET_KEY"], algorithms=["HS256"]
+        )
+        assert decode_auth_token["username"] == "refresh_user"
+        request.config.cache.set("rotated_refresh_token", refresh_token)
+        request.config.cache.set("refresh_token", response_data["user"]["refresh_token"])
+
+    @pytest.mark.parametrize(
+        "refresh_token_json, expected_status_code, expected_data",
+        [
+            (
+                {"refresh_token": "unknown"},
+                403,
+                {"message": "Refresh token is invalid"},
+            ),
+            (
+                {"": "unknown"},
+                422,
+                {
+                    "message": "{'refresh_token': ['Missing data for required field.'], '': "
+                    "['Unknown field.']}"
+                },
+            ),
+        ],
+    )
+    def test_refresh_invalid(self, refresh_token_json, expected_status_code, expected_data):
+        response = post("api/v1/user/refresh", refresh_token_json)
+        assert response.get_json() == expected_data
+        assert response.status_code == expected_status_code
+
+    def test_reuse_revokes_all(self, request):
+        rotated_refresh_token = request.config.cache.get("rotated_refresh_token", None)
+        refresh_token = request.config.cache.get("refresh_token", None)
+        response = post("api/v1/user/refresh", {"refresh_token": rotated_refresh_token})
+        assert response.get_json() == {"message": "Refresh token is revoked"}
+        assert response.status_code == 403
+        response = post("api/v1/user/refresh", {"refresh_token": refresh_token})
+        assert response.get_json() == {"message": "Refresh token is revoked"}
+        assert response.status_code == 403
+
+    def test_logout(self):
+        response = post("api/v1/user/login", {"username": "refresh_user", "password": "123123"})
+        refresh_token = response.get_json()["user"]["refresh_token"]
+        response = post("api/v1/user/logout", {"refresh_token": refresh_token})
+        assert response.get_json() == {"message": "Refresh token revoked"}
+        assert response.status_code == 200
+        response = post("api/v1/user/refresh", {"refresh_token": refresh_token})
+        assert response.status_code == 403
+
+    def test_concurrent_refresh_is_reuse(self, monkeypatch):
+        response = post("api/v1/user/login", {"username": "refresh_user", "password": "123123"})
+        refresh_token = response.get_json()["user"]["refresh_token"]
+        find = RefreshToken.find
+
+        def find_then_race(token):
+            found = find(token)
+            # Another request rotates the same token after this one loaded it.
+            with db.get_engine().begin() as connection:
+                connection.execute(
+                    RefreshToken.__table__.update().where(RefreshToken.id == found[0].id).values(revoked=True)
+                )
+            return found
+
+        monkeypatch.setattr(RefreshToken, "find", find_then_race)
+        response = post("api/v1/user/refresh", {"refresh_token": refresh_token})
+        assert response.get_json() == {"message": "Refresh token is revoked"}
+        assert response.status_code == 403
+        with app.app_context():
+            assert RefreshToken.query.filter_by(revoked=False).count() == 0
@@ -0,0 +1,52 @@
+import os
+import random
+import tempfile
+
+import pytest
+from api_app import db
+from api_app.models import Item, User
+
+from seed_db import app, items_per_user, seed
+
+
+@pytest.fixture()
+def configure_app():
+    db_fb, db_path = tempfile.mkstemp()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    with app.app_context():
+        db.create_all()
+        yield
+        db.session.remove()
+        db.get_engine(app).dispose()
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+@pytest.mark.usefixtures("configure_app")
+class TestSeed:
+    def test_seed_fixed(self):
+        stats = seed(users=5, items=3, batch_size=2, password="seed_password")
+        assert stats["users"] == 5
+        assert stats["items"] == 15
+        assert User.query.count() == 5
+        assert Item.query.count() == 15
+        user = User.query.filter_by(username="seed_0_4").one()
+        assert len(user.items) == 3
+        assert user.verify_password("seed_password")
+
+    def test_seed_is_deterministic(self):
+        seed(users=4, items=5, distribution="pareto", seed_value=7, batch_size=3)
+        first = [(item.name, item.user.username) for item in Item.query.order_by(Item.id)]
+        Item.query.delete()
+        User.query.delete()
+        db.session.commit()
+        seed(users=4, items=5, distribution="pareto", seed_value=7, batch_size=3)
+        second = [(item.name, item.user.username) for item in Item.query.order_by(Item.id)]
+        assert first == second
+
+    @pytest.mark.parametrize("distribution", ["fixed", "uniform", "pareto"])
+    def test_distribution_mean(self, distribution):
+        rng = random.Random(1)
+        counts = [items_per_user(rng, distribution, 10) for _ in range(20000)]
+        assert 9 <= sum(counts) / len(counts) <= 11
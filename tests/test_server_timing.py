@@ -0,0 +1,92 @@
+import logging
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from api_app import create_app, db
+from flask import json
+
+app = create_app()
+
+
+def create_auth_token(username):
+    auth_token = jwt.encode(
+        {
+            "exp": datetime.utcnow()
+            + timedelta(seconds=app.config["AUTH_TOKEN_PERIOD_EXPIRE_SECONDS"]),
+            "username": username,
+        },
+        app.config["SECRET_KEY"],
+    )
+    return auth_token
+
+
+def create_item():
+    return app.test_client().post(
+        "api/v1/items/new",
+        data=json.dumps({"name": "Timed item"}),
+        content_type="application/json",
+        headers={"x-access-tokens": create_auth_token("timing_user")},
+    )
+
+
+@pytest.fixture(scope="class")
+def configure_app():
+    db_fb, db_path = tempfile.mkstemp()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    app.config["SECRET_KEY"] = "TestKey"
+    yield
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+@pytest.fixture(scope="class")
+def create_db():
+    with app.app_context():
+        db.create_all()
+    app.test_client().post(
+        "api/v1/user/registration",
+        data=json.dumps({"username": "timing_user", "password": "123123"}),
+        content_type="application/json",
+    )
+
+
+@pytest.fixture()
+def disable_server_timing():
+    app.config["SERVER_TIMING_ENABLED"] = False
+    yield
+    app.config["SERVER_TIMING_ENABLED"] = True
+
+
+@pytest.mark.usefixtures("configure_app", "create_db")
+class TestServerTiming:
+    def test_header(self):
+        response = create_item()
+        assert response.status_code == 200
+        metrics = [metric.split(";") for metric in response.headers["Server-Timing"].split(", ")]
+        assert [name for name, _ in metrics] == ["auth", "validation", "db", "serialization", "total"]
+        for _, duration in metrics:
+            assert duration.startswith("dur=")
+            assert float(duration[4:]) >= 0
+
+    def test_access_log(self, caplog):
+        with caplog.at_level(logging.INFO, logger="api_app.access"):
+            create_item()
+        record = caplog.records[-1]
+        assert record.method == "POST"
+        assert record.path == "/api/v1/items/new"
+        assert record.endpoint == "api.create_item"
+        assert record.status == 200
+        assert record.db_queries >= 3
+        assert record.total_ms >= record.serialization_ms
+
+    @pytest.mark.usefixtures("disable_server_timing")
+    def test_disabled(self, caplog):
+        with caplog.at_level(logging.INFO, logger="api_app.access"):
+            response = create_item()
+        assert response.status_code == 200
+        assert "Server-Timing" not in response.headers
+        assert caplog.records == []
@@ -0,0 +1,92 @@
+import logging
+import os
+import tempfile
+
+import pytest
+from api_app import create_app, db, queries, slow_query_log
+from api_app.models import Item, User
+from api_app.slowlog import fingerprint, parameter_shape
+
+app = create_app()
+
+
+@pytest.fixture(scope="class")
+def configure_app():
+    db_fb, db_path = tempfile.mkstemp()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username="slow_user", password="123123"))
+        db.session.commit()
+        db.session.add(Item(name="Slow item", user_id=1))
+        db.session.commit()
+    app.config["SLOW_QUERY_THRESHOLD_MS"] = 0
+    yield
+    app.config["SLOW_QUERY_THRESHOLD_MS"] = None
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("SELECT * FROM items WHERE id = 1", "select *  from items\nwhere id = 25"),
+        ("SELECT * FROM items WHERE id IN (?, ?)", "SELECT * FROM items WHERE id IN (?, ?, ?, ?)"),
+        ("SELECT * FROM users WHERE username = 'a'", "SELECT * FROM users WHERE username = 'it''s'"),
+    ],
+)
+def test_fingerprint(first, second):
+    assert fingerprint(first) == fingerprint(second)
+    assert fingerprint(first) != fingerprint("SELECT * FROM other WHERE id = 1")
+
+
+def test_parameter_shape():
+    assert parameter_shape((1, "name"), False) == ["int", "str"]
+    assert parameter_shape({"id": 1}, False) == {"id": "int"}
+    assert parameter_shape([(1, "a"), (2, "b")], True) == {"rows": 2, "row": ["int", "str"]}
+
+
+@pytest.mark.usefixtures("configure_app")
+class TestSlowQueryLog:
+    def test_logs_with_explain(self, caplog):
+        with app.test_request_context("/api/v1/send", method="POST"), caplog.at_level(
+            logging.WARNING, "api_app.slow_query"
+        ):
+            assert queries.user_id_by_username("slow_user") == 1
+            stats = slow_query_log.stats()
+            db.session.remove()
+        record = caplog.records[-1]
+        assert "FROM users" in record.statement
+        assert record.parameter_shape == ["str"]
+        assert record.route == "api.send_item"
+        assert record.count == 1
+        assert any("SCAN" in str(row) or "SEARCH" in str(row) for row in record.explain)
+        assert stats[record.fingerprint]["count"] == 1
+
+    def test_rate_limited_per_fingerprint(self, caplog):
+        with app.app_context(), caplog.at_level(logging.WARNING, "api_app.slow_query"):
+            for username in ("a", "b", "c"):
+                queries.user_id_by_username(username)
+            stats = slow_query_log.stats()
+            db.session.remove()
+        assert caplog.records == []
+        counts = [value["count"] for value in stats.values() if "FROM users" in value["statement"]]
+        assert counts == [4]
+        assert [value["suppressed"] for value in stats.values() if "FROM users" in value["statement"]] == [3]
+
+    def test_max_fingerprints_evicts_least_recently_logged(self, caplog):
+        with app.app_context(), caplog.at_level(logging.WARNING, "api_app.slow_query"):
+            before = slow_query_log.stats()
+            app.config["SLOW_QUERY_MAX_FINGERPRINTS"] = len(before)
+            try:
+                for _ in range(3):
+                    db.session.execute(db.text("SELECT count(*) FROM items"))
+            finally:
+                app.config["SLOW_QUERY_MAX_FINGERPRINTS"] = 1000
+            stats = slow_query_log.stats()
+            db.session.remove()
+        assert [record.statement for record in caplog.records] == ["SELECT count(*) FROM items"]
+        assert len(stats) == len(before)
+        assert next(iter(before)) not in stats
+        assert [value["suppressed"] for value in stats.values() if "count(*)" in value["statement"]] == [2]
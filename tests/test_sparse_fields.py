@@ -0,0 +1,117 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from api_app import create_app, db
+from flask import json
+
+app = create_app()
+
+
+def create_auth_token(username):
+    auth_token = jwt.encode(
+        {
+            "exp": datetime.utcnow()
+            + timedelta(seconds=app.config["AUTH_TOKEN_PERIOD_EXPIRE_SECONDS"]),
+            "username": username,
+        },
+        app.config["SECRET_KEY"],
+    )
+    return auth_token
+
+
+@pytest.fixture(scope="class")
+def configure_app():
+    db_fb, db_path = tempfile.mkstemp()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    app.config["SECRET_KEY"] = "TestKey"
+    yield
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+@pytest.fixture(scope="class")
+def create_db():
+    with app.app_context():
+        db.create_all()
+
+
+@pytest.fixture(scope="class")
+def create_users():
+    for username in ("fields_user", "d_fields_user"):
+        app.test_client().post(
+            "api/v1/user/registration",
+            data=json.dumps({"username": username, "password": "123123"}),
+            content_type="application/json",
+        )
+
+
+@pytest.mark.usefixtures("configure_app", "create_db", "create_users")
+class TestSparseFields:
+    @pytest.mark.parametrize(
+        "fields, expected_status_code, expected_data",
+        [
+            ("id", 200, {"item": {"id": 1}}),
+            ("name,id", 200, {"item": {"id": 2, "name": "Fields item"}}),
+            (None, 200, {"item": {"id": 3, "name": "Fields item", "user_id": 1}}),
+            ("id,owner", 422, {"message": "{'fields': {'owner': ['Unknown field.']}}"}),
+            (",", 422, {"message": "{'fields': ['Field list is empty.']}"}),
+        ],
+    )
+    def test_create_item(self, fields, expected_status_code, expected_data):
+        response = app.test_client().post(
+            "api/v1/items/new",
+            query_string={"fields": fields} if fields is not None else {},
+            data=json.dumps({"name": "Fields item"}),
+            content_type="application/json",
+            headers={"x-access-tokens": create_auth_token("fields_user")},
+        )
+        assert response.get_json() == expected_data
+        assert response.status_code == expected_status_code
+
+    @pytest.mark.parametrize(
+        "fields, expected_status_code, expected_data",
+        [
+            ("id", 200, {"items": [{"id": 1}, {"id": 2}, {"id": 3}]}),
+            (
+                "user_id,id",
+                200,
+                {"items": [{"id": 1, "user_id": 1}, {"id": 2, "user_id": 1}, {"id": 3, "user_id": 1}]},
+            ),
+            ("id", 200, {"items": [{"id": 1}, {"id": 2}, {"id": 3}]}),
+            ("password", 422, {"message": "{'fields': {'password': ['Unknown field.']}}"}),
+        ],
+    )
+    def test_get_items(self, fields, expected_status_code, expected_data):
+        response = app.test_client().get(
+            "api/v1/items",
+            query_string={"fields": fields},
+            headers={"x-access-tokens": create_auth_token("fields_user")},
+        )
+        assert response.get_json() == expected_data
+        assert response.status_code == expected_status_code
+
+    def test_get_item(self):
+        client = app.test_client()
+        move_url = client.post(
+            "api/v1/send",
+            data=json.dumps({"new_username": "d_fields_user", "item_id": 1}),
+            content_type="application/json",
+            headers={"x-access-tokens": create_auth_token("fields_user")},
+        ).get_json()["move_url"]
+        response = client.get(
+            move_url,
+            query_string={"fields": "user_id"},
+            headers={"x-access-tokens": create_auth_token("d_fields_user")},
+        )
+        assert response.get_json() == {"user": {"user_id": 2}}
+        assert response.status_code == 200
+        response = client.get(
+            "api/v1/items",
+            query_string={"fields": "id"},
+            headers={"x-access-tokens": create_auth_token("fields_user")},
+        )
+        assert response.get_json() == {"items": [{"id": 2}, {"id": 3}]}
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from api_app import create_app, db, revocation
+from api_app.models import RevokedToken
+from api_app.revocation import BloomFilter
+from flask import json
+
+app = create_app()
+
+
+def post(url, data, headers=None):
+    return app.test_client().post(url, data=json.dumps(data), content_type="application/json", headers=headers)
+
+
+def get_items(auth_token, target_app=app):
+    return target_app.test_client().get("api/v1/items", headers={"x-access-tokens": auth_token})
+
+
+def login():
+    response = post("api/v1/user/login", {"username": "revoke_user", "password": "123123"})
+    return response.get_json()["user"]
+
+
+@pytest.fixture(scope="class")
+def configure_app():
+    db_fb, db_path = tempfile.mkstemp()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ db_path }"
+    app.config["SECRET_KEY"] = "TestKey"
+    yield
+    os.close(db_fb)
+    os.unlink(db_path)
+
+
+@pytest.fixture(scope="class")
+def create_db():
+    with app.app_context():
+        db.create_all()
+    post("api/v1/user/registration", {"username": "revoke_user", "password": "123123"})
+
+
+def test_bloom_filter():
+    bloom_filter = BloomFilter(1000, 0.01)
+    assert bloom_filter.hashes == 7
+    added = [uuid.uuid4().hex for _ in range(1000)]
+    for value in added:
+        bloom_filter.add(value)
+    assert all(value in bloom_filter for value in added)
+    false_positives = sum(uuid.uuid4().hex in bloom_filter for _ in range(10000))
+    assert false_positives < 300
+
+
+@pytest.mark.usefixtures("configure_app", "create_db")
+class TestTokenRevocation:
+    def test_logout_revokes_access_token(self):
+        user, other_user = login(), login()
+        assert get_items(user["auth_token"]).status_code == 200
+        response = post(
+            "api/v1/user/logout", {"refresh_token": user["refresh_token"]}, {"x-access-tokens": user["auth_token"]}
+        )
+        assert response.status_code == 200
+        response = get_items(user["auth_token"])
+        assert response.get_json() == {"message": "Token is revoked"}
+        assert response.status_code == 403
+        assert get_items(other_user["auth_token"]).status_code == 200
+
+    def test_other_worker_sees_revocation_after_refresh(self):
+        other_app = create_app()
+        other_app.config.update(app.config)
+        user = login()
+        assert get_items(user["auth_token"], other_app).status_code == 200
+        post("api/v1/user/logout", {"refresh_token": user["refresh_token"]}, {"x-access-tokens": user["auth_token"]})
+        assert get_items(user["auth_token"], other_app).status_code == 200
+        other_app.config["REVOCATION_REFRESH_SECONDS"] = 0
+        assert get_items(user["auth_token"], other_app).status_code == 403
+
+    def test_false_positive_falls_back_to_db(self):
+        user = login()
+        jti = jwt.decode(user["auth_token"], app.config["SECRET_KEY"], algorithms=["HS256"])["jti"]
+        with app.app_context():
+            app.extensions["revocation"]["filter"].add(jti)
+        assert get_items(user["auth_token"]).status_code == 200
+
+    def test_expired_rows_are_pruned(self):
+        with app.app_context():
+            expired_at = datetime.utcnow() - timedelta(seconds=1)
+            db.session.add(RevokedToken(jti="expired", expires_at=expired_at))
+            db.session.commit()
+            app.config["REVOCATION_PRUNE_SECONDS"] = 0
+            revocation.refresh()
+            assert RevokedToken.query.filter_by(jti="expired").first() is None
+            assert RevokedToken.query.count() == 2
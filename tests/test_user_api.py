@@ -33,9 +33,10 @@ def slow_down_tests():
 
 @pytest.fixture()
 def reduce_period_expire():
+    period_expire = app.config["AUTH_TOKEN_PERIOD_EXPIRE_SECONDS"]
     app.config["AUTH_TOKEN_PERIOD_EXPIRE_SECONDS"] = 3
     yield
-    app.config["AUTH_TOKEN_PERIOD_EXPIRE_SECONDS"] = 86400
+    app.config["AUTH_TOKEN_PERIOD_EXPIRE_SECONDS"] = period_expire
 
 
 @pytest.mark.usefixtures("configure_app", "create_db")
@@ -0,0 +1,27 @@
+import argparse
+import sys
+
+from api_app import create_app, ownership
+
+app = create_app()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check the item ownership index against the items table.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--repair", action="store_true", help="drop mismatched entries, reads fill them again")
+    args = parser.parse_args()
+    if app.config["CACHE_BACKEND"] == "memory":
+        # A fresh process has an empty in-memory index of its own.
+        parser.error("the ownership index is only shared with CACHE_BACKEND=redis")
+    with app.app_context():
+        stats = ownership.verify(args.batch_size, args.repair)
+    mismatched = stats["mismatched"]
+    print(f"Checked { stats['checked'] } items, { stats['cached'] } cached, { len(mismatched) } mismatched")
+    if mismatched:
+        print(f"Mismatched item ids{ ' (repaired)' if args.repair else '' }: { ', '.join(map(str, mismatched[:100])) }")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
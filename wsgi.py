@@ -1,6 +1,8 @@
 from api_app import create_app
+from api_app.warmup import warm_up
 
 app = create_app()
 
 if __name__ == '__main__':
+    warm_up(app)
     app.run()
\ No newline at end of file